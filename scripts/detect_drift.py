@@ -5,13 +5,13 @@ Purpose: Detect dataset drift between training data and new queries
 using statistical tests and distribution metrics.
 """
 
+import math
 import sys
 import os
 from pathlib import Path
 import numpy as np
 import pandas as pd
 from scipy import stats
-from scipy.spatial.distance import cosine
 from sklearn.feature_extraction.text import TfidfVectorizer
 import json
 from datetime import datetime
@@ -29,14 +29,19 @@ def kl_divergence(p: np.ndarray, q: np.ndarray, epsilon: float = 1e-10) -> float
     Compute KL divergence between two probability distributions.
     KL(P||Q) = sum(p_i * log(p_i / q_i))
     """
-    p = np.asarray(p) + epsilon
-    q = np.asarray(q) + epsilon
+    # Each input is copied once (the epsilon add); everything after that works in place
+    p = np.asarray(p, dtype=float) + epsilon
+    q = np.asarray(q, dtype=float) + epsilon
 
     # Normalize to probabilities
-    p = p / p.sum()
-    q = q / q.sum()
+    p /= p.sum()
+    q /= q.sum()
 
-    return np.sum(p * np.log(p / q))
+    # p * log(p / q), reusing one buffer for the ratio, log and product
+    terms = p / q
+    np.log(terms, out=terms)
+    terms *= p
+    return terms.sum()
 
 
 def js_divergence(p: np.ndarray, q: np.ndarray) -> float:
@@ -44,9 +49,10 @@ def js_divergence(p: np.ndarray, q: np.ndarray) -> float:
     Compute Jensen-Shannon divergence (symmetric version of KL).
     JS(P||Q) = 0.5 * KL(P||M) + 0.5 * KL(Q||M) where M = 0.5(P+Q)
     """
-    p = np.asarray(p)
-    q = np.asarray(q)
-    m = 0.5 * (p + q)
+    p = np.asarray(p, dtype=float)
+    q = np.asarray(q, dtype=float)
+    m = p + q
+    m *= 0.5
     return 0.5 * kl_divergence(p, m) + 0.5 * kl_divergence(q, m)
 
 
@@ -72,8 +78,10 @@ def compute_tfidf_drift(train_queries: List[str], new_queries: List[str]) -> Dic
     new_tfidf = vectorizer.transform(new_queries)
     new_mean = new_tfidf.mean(axis=0).A1
 
-    # Compute cosine distance
-    cos_dist = cosine(train_mean, new_mean)
+    # Compute cosine distance: scipy's cosine expression and clipping, minus its argument validation
+    uv = train_mean @ new_mean
+    cos_dist = 1.0 - uv / math.sqrt((train_mean @ train_mean) * (new_mean @ new_mean))
+    cos_dist = min(max(cos_dist, 0.0), 2.0)
 
     # Vocabulary overlap
     train_vocab = set(vectorizer.vocabulary_.keys())
@@ -109,9 +117,9 @@ def compute_slot_distribution_drift(train_df: pd.DataFrame, new_df: pd.DataFrame
         new_counts = new_df[slot].fillna("*").value_counts(normalize=False)
 
         # Create aligned distributions
-        all_values = sorted(set(train_counts.index) | set(new_counts.index))
-        train_dist = np.array([train_counts.get(v, 0) for v in all_values], dtype=float)
-        new_dist = np.array([new_counts.get(v, 0) for v in all_values], dtype=float)
+        all_values = train_counts.index.union(new_counts.index)
+        train_dist = train_counts.reindex(all_values, fill_value=0).to_numpy(dtype=float)
+        new_dist = new_counts.reindex(all_values, fill_value=0).to_numpy(dtype=float)
 
         # Normalize
         train_dist = train_dist / train_dist.sum() if train_dist.sum() > 0 else train_dist
@@ -170,11 +178,14 @@ def detect_drift(train_csv: str, new_csv: str, output_json: str = None) -> Dict:
     Returns:
         Dict with all drift metrics
     """
-    train_df = pd.read_csv(train_csv)
-    new_df = pd.read_csv(new_csv)
-
     slots = ["action", "time", "user", "source", "src_ip", "hostname", "severity", "status_code"]
 
+    # Only the query text and slot columns are used; read them all as strings.
+    # A callable usecols tolerates CSVs missing a slot (reported as "missing" below).
+    wanted = {"nl_query", *slots}
+    train_df = pd.read_csv(train_csv, usecols=lambda c: c in wanted, dtype=str)
+    new_df = pd.read_csv(new_csv, usecols=lambda c: c in wanted, dtype=str)
+
     results = {
         "timestamp": datetime.utcnow().isoformat(),
         "train_dataset": str(train_csv),
@@ -237,32 +248,37 @@ def log_drift_summary(results: Dict):
     """Append drift summary to logs/drift_report.log"""
     os.makedirs(os.path.dirname(DRIFT_LOG), exist_ok=True)
 
+    # Assemble the whole entry first so it lands in the log with a single write
+    tfidf = results["metrics"]["tfidf"]
+    length = results["metrics"]["query_length"]
+    parts = [
+        f"\n{'='*80}\n",
+        f"Drift Report - {results['timestamp']}\n",
+        f"{'='*80}\n",
+        f"Training dataset: {results['train_dataset']} ({results['train_size']} queries)\n",
+        f"New dataset: {results['new_dataset']} ({results['new_size']} queries)\n\n",
+
+        "TF-IDF Drift:\n",
+        f"  - Cosine distance: {tfidf.get('cosine_distance', 'N/A'):.4f}\n",
+        f"  - Vocabulary overlap: {tfidf.get('vocabulary_overlap', 'N/A'):.2%}\n\n",
+
+        "Query Length Drift:\n",
+        f"  - KS statistic: {length.get('ks_statistic', 'N/A'):.4f}\n",
+        f"  - p-value: {length.get('p_value', 'N/A'):.4f}\n",
+        f"  - Drift detected: {length.get('drift_detected', 'N/A')}\n\n",
+
+        "Slot Distribution Drift (JS Divergence):\n",
+    ]
+    for slot, metrics in results["metrics"]["slot_distributions"].items():
+        js = metrics.get('js_divergence')
+        if js is not None:
+            parts.append(f"  - {slot:15s}: {js:.4f}\n")
+
+    parts.append(f"\nOVERALL DRIFT: {results['drift_summary']['overall_drift']}\n")
+    parts.append(f"{'='*80}\n")
+
     with open(DRIFT_LOG, "a") as f:
-        f.write(f"\n{'='*80}\n")
-        f.write(f"Drift Report - {results['timestamp']}\n")
-        f.write(f"{'='*80}\n")
-        f.write(f"Training dataset: {results['train_dataset']} ({results['train_size']} queries)\n")
-        f.write(f"New dataset: {results['new_dataset']} ({results['new_size']} queries)\n\n")
-
-        f.write("TF-IDF Drift:\n")
-        tfidf = results["metrics"]["tfidf"]
-        f.write(f"  - Cosine distance: {tfidf.get('cosine_distance', 'N/A'):.4f}\n")
-        f.write(f"  - Vocabulary overlap: {tfidf.get('vocabulary_overlap', 'N/A'):.2%}\n\n")
-
-        f.write("Query Length Drift:\n")
-        length = results["metrics"]["query_length"]
-        f.write(f"  - KS statistic: {length.get('ks_statistic', 'N/A'):.4f}\n")
-        f.write(f"  - p-value: {length.get('p_value', 'N/A'):.4f}\n")
-        f.write(f"  - Drift detected: {length.get('drift_detected', 'N/A')}\n\n")
-
-        f.write("Slot Distribution Drift (JS Divergence):\n")
-        for slot, metrics in results["metrics"]["slot_distributions"].items():
-            js = metrics.get('js_divergence')
-            if js is not None:
-                f.write(f"  - {slot:15s}: {js:.4f}\n")
-
-        f.write(f"\nOVERALL DRIFT: {results['drift_summary']['overall_drift']}\n")
-        f.write(f"{'='*80}\n")
+        f.write("".join(parts))
 
 
 def main():
@@ -34,27 +34,28 @@ REPORT_PATH.parent.mkdir(exist_ok=True)
 print(f"Running evaluation on {EVAL_PATH} ...")
 
 df = pd.read_csv(EVAL_PATH)
-results = []
 
-for _, row in df.iterrows():
-    nl_query = row["input"]
-    expected = row["expected_spl"].strip()
 
+def _safe_parse(nl_query):
+    """Generated SPL for one query, or an ERROR string if parsing raises."""
     try:
         output = parse_query(nl_query)
-        generated = output.get("spl", str(output)).strip()
+        return output.get("spl", str(output)).strip()
     except Exception as e:
-        generated = f"ERROR: {e}"
+        return f"ERROR: {e}"
 
-    passed = generated == expected
-    results.append({
-        "input": nl_query,
-        "expected_spl": expected,
-        "generated_spl": generated,
-        "pass": passed
-    })
 
-out = pd.DataFrame(results)
+# Plain lists instead of df.iterrows(), which boxes every row into a Series
+inputs = df["input"].tolist()
+expected = df["expected_spl"].str.strip().tolist()
+generated = [_safe_parse(q) for q in inputs]
+
+out = pd.DataFrame({
+    "input": inputs,
+    "expected_spl": expected,
+    "generated_spl": generated,
+})
+out["pass"] = out["generated_spl"] == out["expected_spl"]
 accuracy = (out["pass"].sum() / len(out)) * 100
 timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
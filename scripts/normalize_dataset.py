@@ -18,16 +18,29 @@ Outputs:
 Owner: @kaden
 """
 import argparse
-import csv
 import datetime
+import os
+import shutil
 import sys
 from pathlib import Path
+import numpy as np
+import pandas as pd
 import yaml
-from collections import defaultdict
+
+# Add src to path
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+from dataset_io import read_csv_strings
+
+# Use the C (libyaml) safe loader when available
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
 
 def load_schema(schema_path: Path):
     with open(schema_path, "r") as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=_YamlLoader)
 
 def build_alias_maps(schema: dict):
     """
@@ -45,38 +58,31 @@ def build_alias_maps(schema: dict):
         alias_maps[slot_name] = m
     return alias_maps
 
-def normalize_cell(value):
-    if value is None:
-        return ""
-    return str(value).strip()
-
-def map_value(value, alias_map):
+def map_column(values: pd.Series, alias_map: dict) -> pd.Series:
     """
-    Map value using alias_map (lowercased) if present, else return original value.
+    Map each (already stripped) value through alias_map by its lowercased form.
+    Values without an alias are returned unchanged; canonical values come back stripped.
     """
-    if value is None:
-        return value
-    key = str(value).strip().lower()
-    return alias_map.get(key, value)
+    if not alias_map:
+        return values
+    canonical = {k: str(v).strip() for k, v in alias_map.items()}
+    return values.str.lower().map(canonical).fillna(values)
 
-def validate_against_schema(value, slot_def):
+def invalid_mask(values: pd.Series, slot_def: dict) -> pd.Series:
     """
-    Check whether `value` is valid for the slot according to slot_def['values'] if enum,
-    or allow anything for string_or_wildcard.
+    Boolean mask of values that are invalid for the slot according to slot_def['values'] if enum,
+    or empty for string_or_wildcard.
     """
-    if value is None:
-        return False
     t = slot_def.get("type", "")
     if t == "enum":
-        allowed = [str(v) for v in slot_def.get("values", [])]
-        return str(value) in allowed
+        allowed = {str(v) for v in slot_def.get("values", [])}
+        return ~values.isin(allowed)
     elif t == "string_or_wildcard":
         # require not-empty, wildcard allowed
-        s = str(value).strip()
-        return s != ""
+        return values.str.strip() == ""
     else:
         # unknown type: accept (conservative)
-        return True
+        return pd.Series(False, index=values.index)
 
 def process(csv_path: Path, schema_path: Path, apply_changes: bool = False, report_limit: int = 200):
     schema = load_schema(schema_path)
@@ -88,88 +94,129 @@ def process(csv_path: Path, schema_path: Path, apply_changes: bool = False, repo
         print(f"[ERROR] dataset not found: {csv_path}")
         sys.exit(2)
 
-    # Read CSV
-    with open(csv_path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-        fieldnames = reader.fieldnames or []
+    # Read CSV (every cell as a string; short rows are padded with "", long rows are noted)
+    long_rows = []
+    try:
+        df = read_csv_strings(csv_path, long_rows=long_rows).fillna("")
+    except pd.errors.EmptyDataError:
+        df = pd.DataFrame()
+    fieldnames = list(df.columns)
 
     if not fieldnames:
         print("[ERROR] CSV has no header / columns")
         sys.exit(3)
 
     # Track changes and invalids
-    change_counts = defaultdict(int)
-    invalid_rows = []
-    sample_changes = defaultdict(list)  # slot -> [(rownum, orig, mapped), ...]
-
-    for i, row in enumerate(rows, start=1):
-        # For each slot configured in schema, attempt to map and validate
-        row_changed = False
-        for slot_name, slot_def in slots.items():
-            # only handle columns present in CSV
-            if slot_name not in row:
-                continue
-            orig = normalize_cell(row[slot_name])
-            mapped = map_value(orig, alias_maps.get(slot_name, {}))
-            # If mapped is still string but canonical may be non-lowercased; convert mapped to str
-            mapped = "" if mapped is None else str(mapped).strip()
-            if mapped != orig:
-                change_counts[slot_name] += 1
-                row[slot_name] = mapped
-                row_changed = True
-                if len(sample_changes[slot_name]) < 10:
-                    sample_changes[slot_name].append((i, orig, mapped))
-            # validate after mapping
-            valid = validate_against_schema(mapped, slot_def)
-            if not valid:
-                invalid_rows.append((i, slot_name, orig, mapped, row["nl_query"] if "nl_query" in row else ""))
+    change_counts = {}
+    invalid_rows = []  # only the first report_limit, in row order
+    invalid_count = 0
+    sample_changes = {}  # slot -> [(rownum, orig, mapped), ...]
+    has_nl = "nl_query" in df.columns
+
+    # Map and validate one slot column at a time; rows are numbered from 1 in the report
+    first_change = {}  # slot -> (first changed row, slot position)
+    inv_rows, inv_pos, inv_slots, inv_orig, inv_mapped = [], [], [], [], []
+    for pos, (slot_name, slot_def) in enumerate(slots.items()):
+        # only handle columns present in CSV
+        if slot_name not in df.columns:
+            continue
+        # Slot columns repeat a handful of values; strip/map/validate each distinct value once
+        codes, uniques = pd.factorize(df[slot_name])
+        orig = pd.Series(uniques, dtype=object).str.strip()
+        mapped = map_column(orig, alias_maps.get(slot_name, {}))
+        orig_vals = orig.to_numpy(dtype=object)[codes]
+        mapped_vals = mapped.to_numpy(dtype=object)[codes]
+
+        changed = np.flatnonzero(mapped_vals != orig_vals)
+        if len(changed):
+            change_counts[slot_name] = len(changed)
+            first_change[slot_name] = (changed[0], pos)
+            head = changed[:10]
+            sample_changes[slot_name] = list(zip((head + 1).tolist(), orig_vals[head], mapped_vals[head]))
+            df.iloc[changed, df.columns.get_loc(slot_name)] = mapped_vals[changed]
+
+        # validate after mapping
+        bad = np.flatnonzero(invalid_mask(mapped, slot_def).to_numpy()[codes])
+        inv_rows.append(bad)
+        inv_pos.append(np.full(len(bad), pos))
+        inv_slots.append(np.full(len(bad), slot_name, dtype=object))
+        inv_orig.append(orig_vals[bad])
+        inv_mapped.append(mapped_vals[bad])
+
+    # Report in the same row-major order a row-by-row pass would produce
+    order = sorted(first_change, key=first_change.get)
+    change_counts = {slot: change_counts[slot] for slot in order}
+    sample_changes = {slot: sample_changes[slot] for slot in order}
+    if inv_rows:
+        rows_idx = np.concatenate(inv_rows)
+        invalid_count = len(rows_idx)
+        # Only the rows that make it into the report are turned into tuples
+        by_row = np.lexsort((np.concatenate(inv_pos), rows_idx))[:max(report_limit, 0)]
+        rows_idx = rows_idx[by_row]
+        invalid_rows = list(zip(
+            (rows_idx + 1).tolist(),
+            np.concatenate(inv_slots)[by_row],
+            np.concatenate(inv_orig)[by_row],
+            np.concatenate(inv_mapped)[by_row],
+        ))
 
     # Summary
-    now = datetime.datetime.utcnow().isoformat()
+    # One timestamp for the run: ISO for the report, colon-free for the backup filename
+    ts_iso = datetime.datetime.utcnow().isoformat()
+    ts_fname = ts_iso.replace(":", "-")
     report_path = csv_path.with_name(csv_path.name + ".normalize_report.txt")
+    out = [
+        f"Normalization report for {csv_path}\n",
+        f"Schema: {schema_path}\n",
+        f"Generated: {ts_iso} UTC\n\n",
+        "Change counts:\n",
+    ]
+    out.extend(f"  {slot}: {cnt}\n" for slot, cnt in change_counts.items())
+    out.append("\nSample changes (up to 10 per slot):\n")
+    for slot, samples in sample_changes.items():
+        out.append(f"\n[{slot}]\n")
+        out.extend(f"  row {r}: '{o}' -> '{m}'\n" for (r, o, m) in samples)
+    out.append("\nInvalid rows after mapping (first 200):\n")
+    out.extend(
+        # nl_query is looked up only here, for the rows actually reported
+        f"Row {rownum}: slot={slot}, orig='{orig}', mapped='{mapped}'\n"
+        f"  NL: {df['nl_query'].iat[rownum - 1] if has_nl else ''}\n"
+        for rownum, slot, orig, mapped in invalid_rows
+    )
+    out.append(f"\nTotal invalid rows after mapping: {invalid_count}\n")
     with open(report_path, "w", encoding="utf-8") as rep:
-        rep.write(f"Normalization report for {csv_path}\n")
-        rep.write(f"Schema: {schema_path}\n")
-        rep.write(f"Generated: {now} UTC\n\n")
-        rep.write("Change counts:\n")
-        for slot, cnt in change_counts.items():
-            rep.write(f"  {slot}: {cnt}\n")
-        rep.write("\nSample changes (up to 10 per slot):\n")
-        for slot, samples in sample_changes.items():
-            rep.write(f"\n[{slot}]\n")
-            for (r, o, m) in samples:
-                rep.write(f"  row {r}: '{o}' -> '{m}'\n")
-        rep.write("\nInvalid rows after mapping (first 200):\n")
-        for idx, (rownum, slot, orig, mapped, nl) in enumerate(invalid_rows):
-            if idx >= report_limit:
-                break
-            rep.write(f"Row {rownum}: slot={slot}, orig='{orig}', mapped='{mapped}'\n")
-            rep.write(f"  NL: {nl}\n")
-        rep.write(f"\nTotal invalid rows after mapping: {len(invalid_rows)}\n")
+        rep.write("".join(out))
 
     # Print summary to stdout
     print("Normalization summary:")
     for slot, cnt in change_counts.items():
         print(f"  {slot}: {cnt} changes")
-    print(f"Invalid rows after mapping: {len(invalid_rows)}")
+    print(f"Invalid rows after mapping: {invalid_count}")
     print(f"Report written to: {report_path}")
 
-    if len(invalid_rows) > 0 and not apply_changes:
+    if invalid_count > 0 and not apply_changes:
         print("\n[DRY-RUN] to apply changes run with --apply (creates a backup).")
 
     # Apply changes if requested
+    if apply_changes and long_rows:
+        # Writing these back would drop their extra fields; leave the dataset as it is
+        shown = ", ".join(str(r) for r in long_rows[:20]) + (", ..." if len(long_rows) > 20 else "")
+        print(f"[ERROR] {len(long_rows)} row(s) have more fields than the header (rows {shown}); "
+              "fix them before running with --apply")
+        sys.exit(4)
     if apply_changes:
-        backup_path = csv_path.with_name(csv_path.name + f".backup.{now.replace(':','-')}")
-        # write backup
-        csv_path.rename(backup_path)
+        backup_path = csv_path.with_name(csv_path.name + f".backup.{ts_fname}")
+        # copy the original aside; the dataset itself stays in place until the swap below
+        shutil.copy2(csv_path, backup_path)
         print(f"Backup of original saved to: {backup_path}")
-        # write new csv
-        with open(csv_path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            for row in rows:
-                writer.writerow(row)
+        # write the new csv beside the original, then swap it in with a single atomic rename
+        tmp_path = csv_path.with_name(csv_path.name + ".tmp")
+        try:
+            df.to_csv(tmp_path, index=False, encoding="utf-8", lineterminator="\r\n")
+            os.replace(tmp_path, csv_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)  # don't leave a half-written copy behind
+            raise
         print(f"Applied normalized values and wrote new dataset to: {csv_path}")
 
 def main():
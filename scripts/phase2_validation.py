@@ -8,9 +8,10 @@ Phase 2 validation script
 
 import os
 import csv
-from collections import Counter
 from datetime import datetime, timezone
 import sys
+import numpy as np
+import pandas as pd
 from sklearn.model_selection import train_test_split
 
 ROOT = os.path.dirname(os.path.dirname(__file__))
@@ -18,7 +19,7 @@ DATASET = os.path.join(ROOT, "datasets", "train_queries.csv")
 REPORT_MD = os.path.join(ROOT, "docs", "accuracy_report.md")
 
 sys.path.insert(0, os.path.join(ROOT, "src"))
-from rule_based_parser import parse_query as rule_parse, structured_string
+from rule_based_parser import parse_batch as rule_parse_batch
 import ml_parser
 from drift_hook import UNPARSED_LOG
 
@@ -38,70 +39,127 @@ ROBUSTNESS_QUERIES = [
 ]
 
 def load_dataset(path=DATASET):
+    """Read the dataset in one pass as columns: {column: [values...]}."""
     with open(path, newline="") as f:
-        reader = csv.DictReader(f)
-        return list(reader)
+        reader = csv.reader(f)
+        header = next(reader, [])
+        columns = [[] for _ in header]
+        width = len(header)
+        for row in reader:
+            if not row:
+                continue  # blank line, skipped like DictReader does
+            if len(row) < width:
+                row += [None] * (width - len(row))  # short row: missing cells read as None
+            for col, val in zip(columns, row):
+                col.append(val)
+    return dict(zip(header, columns))
 
 def norm(v):
-    return None if v is None else str(v).strip().lower()
-
-def evaluate_rule_based(rows):
-    total, exact = len(rows), 0
-    per_field = Counter()
+    if v is None:
+        return None
+    s = str(v).strip()
+    # Most values are already lowercase; skip allocating a copy for those
+    return s if s.islower() else s.lower()
+
+def norm_array(values):
+    """norm() applied once per value, as an object ndarray for element-wise comparison."""
+    return np.array([norm(v) for v in values], dtype=object)
+
+def structured_tokens(field, values):
+    """
+    How structured_string renders `field` for each value, lowercased; None where it omits the slot.
+    action is always shown, time/user/source unless "*", the newer slots unless empty or "*".
+    """
+    out = np.empty(len(values), dtype=object)
+    for i, v in enumerate(values):
+        if field == "action" or (v != "*" if field in ("time", "user", "source") else v and v != "*"):
+            s = str(v)
+            out[i] = s if s.islower() else s.lower()
+    return out
+
+def rendered_tokens(fields, records):
+    """
+    structured_tokens for each field over records, with the last printed token right-stripped.
+    The exact-match comparison norm()s whole structured strings, and stripping a string only
+    reaches into its final token: padding inside earlier tokens still counts, padding at the end doesn't.
+    """
+    tokens = np.column_stack([structured_tokens(f, [r.get(f) for r in records]) for f in fields])
+    if len(tokens):
+        # action is always printed, so every row has a last token
+        last = tokens.shape[1] - 1 - np.argmax((tokens != None)[:, ::-1], axis=1)  # noqa: E711
+        rows = np.arange(len(tokens))
+        tokens[rows, last] = [t.rstrip() for t in tokens[rows, last]]
+    return tokens
+
+def score(matches, exact=None):
+    """
+    Build an evaluator result from per-field boolean match arrays.
+    exact defaults to the queries where every field matched.
+    """
+    arrays = list(matches.values())
+    total = len(arrays[0]) if arrays else 0
+    if exact is None:
+        exact = int(np.logical_and.reduce(arrays).sum()) if total else 0
+    # Like a Counter, per_field only lists fields with at least one match
+    per_field = {f: int(m.sum()) for f, m in matches.items() if m.any()}
+    return {"total": total, "exact": exact, "per_field": per_field}
+
+def evaluate_rule_based(rows, y_norm):
     fields = ["action", "time", "user", "source", "src_ip", "hostname", "severity", "status_code"]
+    parsed = rule_parse_batch([r["nl_query"] for r in rows])
 
-    for r in rows:
-        parsed = rule_parse(r["nl_query"])
-        pred = structured_string(parsed)
-        expected = structured_string({f: r.get(f) for f in fields})
-
-        if norm(pred) == norm(expected):
-            exact += 1
-        for f in fields:
-            if norm(parsed.get(f)) == norm(r[f]):
-                per_field[f] += 1
+    # Exact match compares the slots structured_string would print, without building the strings
+    exact_mask = (rendered_tokens(fields, parsed) == rendered_tokens(fields, rows)).all(axis=1)
+    exact = int(exact_mask.sum())
 
-    return {"total": total, "exact": exact, "per_field": dict(per_field)}
+    matches = {f: norm_array([p.get(f) for p in parsed]) == y_norm[f] for f in fields}
+    return score(matches, exact)
 
-def evaluate_ml(X_test, y_test, classifiers):
+def evaluate_ml(ml_preds, y_norm):
     fields = ["action", "time", "user", "source", "src_ip", "hostname", "severity", "status_code"]
-    preds = [ml_parser.predict_query(q, classifiers) for q in X_test]
 
-    total, exact = len(X_test), 0
-    per_field = Counter()
-    for i, p in enumerate(preds):
-        for f in fields:
-            if norm(p.get(f)) == norm(y_test[f][i]):
-                per_field[f] += 1
-        if all(norm(p.get(f)) == norm(y_test[f][i]) for f in fields):
-            exact += 1
+    # One boolean array per field: does the prediction match the gold label for each query?
+    matches = {f: norm_array(ml_preds[f]) == y_norm[f] for f in fields}
+    return score(matches)
 
-    return {"total": total, "exact": exact, "per_field": dict(per_field)}
-
-def evaluate_hybrid(X_test, y_test, classifiers):
+def evaluate_hybrid(X_test, ml_preds, y_norm):
     fields = ["action", "time", "user", "source", "src_ip", "hostname", "severity", "status_code"]
-    total, exact = len(X_test), 0
-    per_field = Counter()
-
-    for i, q in enumerate(X_test):
-        ml_pred = ml_parser.predict_query(q, classifiers)
-        rb = rule_parse(q)
-
-        combined = {}
-        for slot in fields:
-            v = ml_pred.get(slot)
-            if v in [None, "*"]:
-                v = rb.get(slot)
-            combined[slot] = v
-
-        if all(norm(combined.get(f)) == norm(y_test[f][i]) for f in fields):
-            exact += 1
-
-        for f in fields:
-            if norm(combined.get(f)) == norm(y_test[f][i]):
-                per_field[f] += 1
-
-    return {"total": total, "exact": exact, "per_field": dict(per_field)}
+    rb_preds = rule_parse_batch(X_test)
+
+    # ML value per slot, falling back to the rule-based value where ML has none
+    combined = {}
+    for slot in fields:
+        ml = np.asarray(ml_preds[slot], dtype=object)
+        rb = np.array([p.get(slot) for p in rb_preds], dtype=object)
+        combined[slot] = np.where(pd.isna(ml) | (ml == "*"), rb, ml)
+
+    matches = {f: norm_array(combined[f]) == y_norm[f] for f in fields}
+    return score(matches)
+
+def tail_lines(path, n, block=64 * 1024):
+    """
+    Last n lines of a text file, as iterating the file would yield them.
+    Reads backwards from the end in blocks, so cost tracks the tail rather than the file size.
+    """
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        data = b""
+        # One extra line break is needed so the (possibly partial) first line can be dropped
+        while pos > 0 and len(data.splitlines()) <= n:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+            block *= 2  # grow geometrically so very long lines don't mean many re-splits
+
+    lines = data.splitlines(keepends=True)
+    if pos > 0:
+        lines = lines[1:]
+    # Universal newlines, like text mode: \r\n and \r endings come back as \n
+    return [
+        line.rstrip(b"\r\n").decode("utf-8", "replace") + ("\n" if line.endswith((b"\n", b"\r")) else "")
+        for line in lines[-n:]
+    ]
 
 def write_report(rule_stats, ml_stats, hybrid_stats, real_checks, robustness_checks):
     os.makedirs(os.path.dirname(REPORT_MD), exist_ok=True)
@@ -116,61 +174,61 @@ def write_report(rule_stats, ml_stats, hybrid_stats, real_checks, robustness_che
         "This report summarizes the performance of the SmallAI Hybrid Parser after completing Phase 2 (Execution/MVP).\n\n"
     )
 
+    out = [header, "## Key Results\n"]
+    for name, stats in [("Action", "action"), ("Time", "time"), ("User", "user"), ("Source", "source")]:
+        out.append(f"- **{name} slot:** {pct(ml_stats['per_field'].get(stats, 0), ml_stats['total'])}% accuracy\n")
+    out.append("\n")
+
+    out.append("## Summary\n")
+    out.append(f"- Dataset rows evaluated (test set): {ml_stats['total']}\n")
+    out.append(f"- Rule exact-match: {rule_stats['exact']} / {rule_stats['total']} ({rule_stats['exact']/rule_stats['total']:.2%})\n")
+    out.append(f"- ML exact-match: {ml_stats['exact']} / {ml_stats['total']} ({ml_stats['exact']/ml_stats['total']:.2%})\n")
+    out.append(f"- Hybrid exact-match: {hybrid_stats['exact']} / {hybrid_stats['total']} ({hybrid_stats['exact']/hybrid_stats['total']:.2%})\n\n")
+
+    out.append("## Drift log (last 50 lines)\n")
+    if os.path.exists(UNPARSED_LOG):
+        lines = tail_lines(UNPARSED_LOG, 50)
+        out.extend(f"- {L}" for L in lines)
+    else:
+        out.append("- (no drift log found)\n")
+
     with open(REPORT_MD, "w") as f:
-        f.write(header)
-        f.write("## Key Results\n")
-        for name, stats in [("Action", "action"), ("Time", "time"), ("User", "user"), ("Source", "source")]:
-            f.write(f"- **{name} slot:** {pct(ml_stats['per_field'].get(stats, 0), ml_stats['total'])}% accuracy\n")
-        f.write("\n")
-
-        f.write("## Summary\n")
-        f.write(f"- Dataset rows evaluated (test set): {ml_stats['total']}\n")
-        f.write(f"- Rule exact-match: {rule_stats['exact']} / {rule_stats['total']} ({rule_stats['exact']/rule_stats['total']:.2%})\n")
-        f.write(f"- ML exact-match: {ml_stats['exact']} / {ml_stats['total']} ({ml_stats['exact']/ml_stats['total']:.2%})\n")
-        f.write(f"- Hybrid exact-match: {hybrid_stats['exact']} / {hybrid_stats['total']} ({hybrid_stats['exact']/hybrid_stats['total']:.2%})\n\n")
-
-        f.write("## Drift log (last 50 lines)\n")
-        if os.path.exists(UNPARSED_LOG):
-            with open(UNPARSED_LOG) as lf:
-                lines = lf.readlines()[-50:]
-            for L in lines:
-                f.write(f"- {L}")
-        else:
-            f.write("- (no drift log found)\n")
+        f.write("".join(out))
 
     return REPORT_MD
 
 def main():
     print("Running Phase 2 validation with train/test split...\n")
-    rows = load_dataset()
+    cols = load_dataset()
 
     # Train/test split
     fields = ["action", "time", "user", "source", "src_ip", "hostname", "severity", "status_code"]
-    X = [r["nl_query"] for r in rows]
-    y_dict = {f: [r[f] for r in rows] for f in fields}
+    X = np.array([q.lower() for q in cols["nl_query"]], dtype=object)  # slot model expects lowercased text
+    y_dict = {f: np.array(cols[f], dtype=object) for f in fields}
 
-    # Split data
-    from sklearn.model_selection import train_test_split
-    indices = list(range(len(X)))
-    train_idx, test_idx = train_test_split(indices, test_size=0.2, random_state=42)
+    # Split once on row indices, then gather every column with the same index arrays
+    train_idx, test_idx = train_test_split(np.arange(len(X)), test_size=0.2, random_state=42)
 
-    X_train = [X[i] for i in train_idx]
-    X_test = [X[i] for i in test_idx]
-    y_train = {f: [y_dict[f][i] for i in train_idx] for f in fields}
-    y_test = {f: [y_dict[f][i] for i in test_idx] for f in fields}
+    X_train, X_test = X[train_idx], X[test_idx]
+    y_train = {f: y_dict[f][train_idx] for f in fields}
+    y_test = {f: y_dict[f][test_idx] for f in fields}
 
-    # Train ML classifiers
-    classifiers = {}
-    for field in fields:
-        print(f"Training {field} classifier...")
-        classifiers[field] = ml_parser.train_classifier(X_train, y_train[field])
+    # Train the multi-output ML model (one classifier head per field)
+    print(f"Training slot model ({len(fields)} fields)...")
+    model = ml_parser.train_slot_model(X_train, y_train)
 
     # Evaluate all methods on the same test set
     test_rows = [{**{"nl_query": X_test[i]}, **{f: y_test[f][i] for f in fields}} for i in range(len(X_test))]
 
-    rule_stats = evaluate_rule_based(test_rows)
-    ml_stats = evaluate_ml(X_test, y_test, classifiers)
-    hybrid_stats = evaluate_hybrid(X_test, y_test, classifiers)
+    # Gold labels are normalized once and shared by all three evaluators
+    y_test_norm = {f: norm_array(y_test[f]) for f in fields}
+
+    # ML inference runs once; the ML and hybrid evaluators share the predictions
+    ml_preds = ml_parser.predict_batch(X_test, model)
+
+    rule_stats = evaluate_rule_based(test_rows, y_test_norm)
+    ml_stats = evaluate_ml(ml_preds, y_test_norm)
+    hybrid_stats = evaluate_hybrid(X_test, ml_preds, y_test_norm)
 
     # Report
     report = write_report(rule_stats, ml_stats, hybrid_stats, None, None)
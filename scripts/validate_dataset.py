@@ -4,14 +4,25 @@ scripts/validate_dataset.py
 Validate dataset/log_query_dataset.csv against docs/schema.yaml with alias normalization.
 Exits 0 on success; non-zero if issues found.
 """
-import csv
 import sys
+import numpy as np
+import pandas as pd
 import yaml
 from pathlib import Path
 
+# Add src to path
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+from dataset_io import read_csv_strings
+
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 def load_schema(schema_path):
     with open(schema_path, "r") as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=_YamlLoader)
 
 def build_alias_map(schema):
     """Return a dict mapping lowercased alias -> canonical value"""
@@ -29,55 +40,70 @@ def normalize_value(val):
 def map_alias(value, alias_map):
     if not value:
         return value
-    v = value.strip().lower()
+    # Values are usually already lowercase; try them as-is before allocating a lowered copy
+    canonical = alias_map.get(value)
+    if canonical is not None:
+        return canonical
+    v = value.strip()
+    if not v.islower():
+        v = v.lower()
     return alias_map.get(v, value)  # return canonical if found, else original
 
-def validate_row(row, schema, alias_map):
-    errors = []
-    # required columns
-    required_cols = ["nl_query", "action", "time", "user", "source"]
-    for c in required_cols:
-        if c not in row:
-            errors.append(f"missing column: {c}")
-            return errors
-
-    # Validate action
-    action_val = normalize_value(row["action"])
-    allowed_actions = [str(v) for v in schema["slots"]["action"]["values"]]
-    if action_val not in allowed_actions:
-        errors.append(f"invalid action: '{action_val}'")
-
-    # Validate time
-    time_val = normalize_value(row["time"])
-    allowed_times = [str(v) for v in schema["slots"]["time"]["values"]]
-    if time_val not in allowed_times:
-        errors.append(f"invalid time: '{time_val}'")
-
-    # Validate user (allow wildcard '*')
-    user_val = normalize_value(row["user"])
-    if user_val == "":
-        errors.append("empty user field")
-
-    # Validate source — map aliases first
-    source_val_raw = normalize_value(row["source"])
-    source_mapped = map_alias(source_val_raw, alias_map)
-    allowed_sources = [str(v) for v in schema["slots"]["source"]["values"]]
-    if source_mapped not in allowed_sources:
-        errors.append(f"invalid source: '{source_val_raw}' (mapped to '{source_mapped}')")
-
-    return errors
+def _column_errors(values, check):
+    """Run check(normalized value) -> error or None once per distinct value; one entry per row."""
+    codes, uniques = pd.factorize(values)
+    return np.array([check(normalize_value(v)) for v in uniques], dtype=object)[codes]
+
+def _row_dicts(df, positions=None):
+    """{column: value} per row (or just the rows at positions), like csv.DictReader yields."""
+    values = df.to_numpy(dtype=object)
+    if positions is not None:
+        values = values[positions]
+    header = df.columns.tolist()
+    return [dict(zip(header, row)) for row in values.tolist()]
 
 def validate_csv(csv_path, schema, alias_map):
-    issues = []
-    with open(csv_path, newline="") as f:
-        reader = csv.DictReader(f)
-        rownum = 1
-        for row in reader:
-            errs = validate_row(row, schema, alias_map)
-            if errs:
-                issues.append((rownum, row, errs))
-            rownum += 1
-    return issues
+    try:
+        # Strings throughout, so empty cells read as "" like csv.DictReader gave;
+        # rows longer than the header are validated on their named fields, as before
+        df = read_csv_strings(csv_path).fillna("")
+    except pd.errors.EmptyDataError:
+        return []
+    if df.empty:
+        return []
+
+    # required columns
+    required_cols = ["nl_query", "action", "time", "user", "source"]
+    missing = [c for c in required_cols if c not in df.columns]
+    if missing:
+        errs = [f"missing column: {missing[0]}"]
+        return [(i + 1, row, errs) for i, row in enumerate(_row_dicts(df))]
+
+    # Allowed values are fixed for the whole file, so build the sets once
+    allowed_actions = frozenset(str(v) for v in schema["slots"]["action"]["values"])
+    allowed_times = frozenset(str(v) for v in schema["slots"]["time"]["values"])
+    allowed_sources = frozenset(str(v) for v in schema["slots"]["source"]["values"])
+
+    def check_source(val):
+        # Validate source — map aliases first
+        mapped = map_alias(val, alias_map)
+        return None if mapped in allowed_sources else f"invalid source: '{val}' (mapped to '{mapped}')"
+
+    # Each check runs once per distinct value, in the order errors are reported per row
+    columns = [
+        _column_errors(df["action"], lambda v: None if v in allowed_actions else f"invalid action: '{v}'"),
+        _column_errors(df["time"], lambda v: None if v in allowed_times else f"invalid time: '{v}'"),
+        # Validate user (allow wildcard '*')
+        _column_errors(df["user"], lambda v: "empty user field" if v == "" else None),
+        _column_errors(df["source"], check_source),
+    ]
+
+    # Error messages are non-empty strings, so truthiness marks the rows with issues
+    bad = np.flatnonzero(np.logical_or.reduce([col.astype(bool) for col in columns]))
+    return [
+        (i + 1, row, [col[i] for col in columns if col[i] is not None])
+        for i, row in zip(bad.tolist(), _row_dicts(df, bad))
+    ]
 
 def main():
     if len(sys.argv) != 3:
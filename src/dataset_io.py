@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+dataset_io.py
+-------------
+Shared CSV loading for the dataset tools and parsers.
+
+Cells come back the way csv.DictReader sees them, read through pandas' C parser when
+the file is well formed.
+"""
+
+import csv
+import warnings
+
+import pandas as pd
+
+
+def read_csv_strings(path, usecols=None, long_rows=None) -> pd.DataFrame:
+    """
+    Read a CSV into a DataFrame of string cells (empty cells stay "").
+
+    Rows with more fields than the header keep their first len(header) values, as the
+    named keys of csv.DictReader do; short rows are padded with missing values.
+    pandas rejects such ragged files, or silently shifts columns into an implicit index,
+    so they are re-read with the csv module instead. Pass a list as long_rows to have the
+    1-based numbers of the rows that lost fields appended to it (usecols=None only: with
+    usecols, pandas reads long rows itself and doesn't say which they were).
+
+    Raises pandas.errors.EmptyDataError for a file without a header, like pd.read_csv.
+    """
+    with warnings.catch_warnings():
+        # index_col=False truncates a long first row with only a ParserWarning; treat it as ragged
+        warnings.simplefilter("error", pd.errors.ParserWarning)
+        try:
+            return pd.read_csv(path, dtype=str, keep_default_na=False, index_col=False,
+                               usecols=usecols, encoding="utf-8")
+        except (pd.errors.ParserError, pd.errors.ParserWarning):
+            pass
+
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            raise pd.errors.EmptyDataError("No columns to parse from file")
+        width = len(header)
+        rows = [row for row in reader if row]  # blank lines are skipped, like DictReader does
+
+    for i, row in enumerate(rows):
+        if len(row) > width:
+            rows[i] = row[:width]
+            if long_rows is not None:
+                long_rows.append(i + 1)
+        elif len(row) < width:
+            rows[i] = row + [None] * (width - len(row))
+
+    df = pd.DataFrame(rows, columns=header, dtype=object)
+    if usecols is not None:
+        missing = [c for c in usecols if c not in df.columns]
+        if missing:
+            raise ValueError(f"Usecols do not match columns, columns expected but not found: {missing}")
+        wanted = set(usecols)
+        df = df[[c for c in df.columns if c in wanted]]  # file order, as pd.read_csv returns them
+    return df
@@ -10,9 +10,15 @@ import yaml
 from pathlib import Path
 
 # Import the new slot-based parsers
-from ml_parser import parse_ml
+from ml_parser import parse_ml, SLOTS
 from rule_based_parser import parse_query as parse_rule_based
 
+# libyaml's C loader when PyYAML was built with it; same results, much faster parsing
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 # Use a wildcard index for general deployment (instead of a specific index like "smallai").
 DEFAULT_INDEX = "*"
 
@@ -20,60 +26,102 @@ DEFAULT_INDEX = "*"
 SCHEMA_PATH = Path(__file__).parent.parent / "config" / "schema_map.yaml"
 if SCHEMA_PATH.exists():
     with open(SCHEMA_PATH, "r") as f:
-        SCHEMA_MAP = yaml.safe_load(f)
+        SCHEMA_MAP = yaml.load(f, Loader=_YamlLoader)
 else:
     SCHEMA_MAP = {}
 
 # Model persistence settings
 MODELS_DIR = Path(__file__).parent.parent / "models"
-MODEL_FILES = {
-    "action": MODELS_DIR / "action_classifier.joblib",
-    "time": MODELS_DIR / "time_classifier.joblib",
-    "user": MODELS_DIR / "user_classifier.joblib",
-    "source": MODELS_DIR / "source_classifier.joblib",
-    "src_ip": MODELS_DIR / "src_ip_classifier.joblib",
-    "hostname": MODELS_DIR / "hostname_classifier.joblib",
-    "severity": MODELS_DIR / "severity_classifier.joblib",
-    "status_code": MODELS_DIR / "status_code_classifier.joblib",
-}
+MODEL_FILE = MODELS_DIR / "slot_classifier.joblib"
+
+# Per-slot pipelines written by older --train runs; read only when MODEL_FILE is missing
+LEGACY_MODEL_FILES = {slot: MODELS_DIR / f"{slot}_classifier.joblib" for slot in SLOTS}
 
 # Global cache for loaded models
 _MODELS_CACHE = None
 
-def save_models(classifiers: dict):
+# Words that indicate the user actually asked for a time range
+TIME_HINT_KEYWORDS = ("hour", "day", "week", "month", "yesterday", "today", "since", "last", "past", "ago")
+
+# Slot source -> Splunk sourcetype
+SOURCETYPE_MAP = {
+    "web": "access_combined",  # Apache/nginx access logs
+    "auth": "syslog",           # Auth logs
+    "ssh": "syslog",            # SSH logs
+    "database": "database",     # DB logs
+    "filesystem": "syslog",     # Filesystem logs
+    "host": "syslog",           # Host logs
+    "firewall": "firewall",     # Firewall logs
+    "windows": "WinEventLog",   # Windows Event Logs
+}
+
+# Time slot -> Splunk earliest= modifier
+TIME_MAP = {
+    "last1h": "-1h",
+    "last24h": "-24h",
+    "last7d": "-7d@d",
+    "last30d": "-30d",
+    "last48h": "-48h",
+    "yesterday": "-1d@d",
+    "today": "@d"
+}
+
+# For web logs, search in raw text rather than action field
+WEB_ACTION_FILTERS = {
+    "error": '(status>=400)',
+    "access": '*',  # All requests
+    "success": '(status>=200 status<400)',
+}
+
+# Windows Event Logs use EventCode
+WINDOWS_EVENT_CODES = {
+    "failure": "4625",  # Failed login
+    "success": "4624",  # Successful login
+    "creation": "4720", # User created
+    "deletion": "4726", # User deleted
+}
+
+# Query words that pull NOC status values into the SPL
+NOC_TERMS = ("critical", "crit", "warn", "warning", "alert")
+
+def save_models(model):
     """
-    Save trained ML models to disk using joblib.
+    Save the trained multi-output slot model to disk using joblib.
 
     Args:
-        classifiers: Dict of trained sklearn Pipeline objects (one per slot)
+        model: Trained sklearn Pipeline covering every slot (see ml_parser.train_all)
     """
     import joblib
+    global _MODELS_CACHE
 
     MODELS_DIR.mkdir(exist_ok=True)
+    joblib.dump(model, MODEL_FILE)
 
-    for slot_name, model_path in MODEL_FILES.items():
-        joblib.dump(classifiers[slot_name], model_path)
+    # ml_predict_slots must not keep serving the model this file replaced
+    _MODELS_CACHE = None
 
     print(f"Models saved to {MODELS_DIR}/")
 
 def load_models():
     """
-    Load trained ML models from disk.
+    Load the trained slot model from disk.
+
+    Falls back to the per-slot files from older releases (LEGACY_MODEL_FILES) when
+    MODEL_FILE is missing; re-run --train to replace them with the single model file.
 
     Returns:
-        Dict of classifiers or None if models don't exist
+        Multi-output Pipeline, dict of legacy per-slot Pipelines, or None if no models exist
     """
     import joblib
 
-    # Check if all model files exist
-    if not all(f.exists() for f in MODEL_FILES.values()):
-        return None
+    if MODEL_FILE.exists():
+        return joblib.load(MODEL_FILE)
 
-    classifiers = {}
-    for slot_name, model_path in MODEL_FILES.items():
-        classifiers[slot_name] = joblib.load(model_path)
+    if all(f.exists() for f in LEGACY_MODEL_FILES.values()):
+        print(f"[WARN] Using legacy per-slot models from {MODELS_DIR}/; run --train to migrate to {MODEL_FILE.name}.")
+        return {slot: joblib.load(path) for slot, path in LEGACY_MODEL_FILES.items()}
 
-    return classifiers
+    return None
 
 def train_and_save_models():
     """
@@ -81,11 +129,11 @@ def train_and_save_models():
     """
     import ml_parser
 
-    print("Training ML models (8 classifiers)...")
-    classifiers = ml_parser.train_all()
+    print("Training ML models (8 slots)...")
+    model = ml_parser.train_all()
     print("Training complete.")
 
-    save_models(classifiers)
+    save_models(model)
 
 def ml_predict_slots(query, models=None):
     """
@@ -93,7 +141,7 @@ def ml_predict_slots(query, models=None):
 
     Args:
         query: Natural language query string
-        models: Optional dict of classifiers (one per slot)
+        models: Optional multi-output slot model (or legacy dict of per-slot Pipelines)
                 If None, attempts to load from disk
 
     Returns:
@@ -110,6 +158,11 @@ def ml_predict_slots(query, models=None):
     if models is None:
         return {}  # No models available
 
+    if isinstance(models, dict):
+        # Legacy per-slot Pipelines, each with its own vectorizer
+        q_lower = query.lower()
+        return {slot: clf.predict([q_lower])[0] for slot, clf in models.items()}
+
     import ml_parser
     return ml_parser.predict_query(query, models)
 
@@ -132,6 +185,7 @@ def parse_natural_language(query):
     Step 3: Merge results (rule-based takes precedence for high-precision matches)
     """
     q = normalize_text(query)
+    q_lower = q if q.islower() else q.lower()
 
     # Step 1 — run ML parser (uses pre-trained models from scripts/train_ml_parser.py)
     ml_slots = parse_ml(q)
@@ -140,34 +194,26 @@ def parse_natural_language(query):
     rb_slots = parse_rule_based(q)
 
     # Step 3 — merge dictionaries
-    # Strategy: Use rule-based if it found something specific, otherwise use ML
+    # Strategy: Use rule-based if it found something specific, otherwise use ML.
+    # None and "*" both mean "no value"; either is simply falsy or skipped here.
+    ml_get = ml_slots.get
+    rb_get = rb_slots.get
     slots = {}
-    for key in ["action", "time", "user", "source", "src_ip", "hostname", "severity", "status_code"]:
-        ml_val = ml_slots.get(key)
-        rb_val = rb_slots.get(key)
-
-        # Normalize None and "*" to be equivalent
-        if ml_val in (None, "*"):
-            ml_val = "*"
-        if rb_val in (None, "*"):
-            rb_val = "*"
-
+    for key in SLOTS:
         # Rule-based has high precision - use it if it found something
+        rb_val = rb_get(key)
         if rb_val and rb_val != "*":
             slots[key] = rb_val
-        elif ml_val and ml_val != "*":
+            continue
+
+        ml_val = ml_get(key)
+        if not ml_val or ml_val == "*":
+            slots[key] = "*"
+        elif key == "time" and not any(kw in q_lower for kw in TIME_HINT_KEYWORDS):
             # Special case: Don't default to ML time predictions when no time mentioned
-            if key == "time":
-                time_keywords = ["hour", "day", "week", "month", "yesterday", "today", "since", "last", "past", "ago"]
-                has_time_keyword = any(kw in q.lower() for kw in time_keywords)
-                if has_time_keyword:
-                    slots[key] = ml_val
-                else:
-                    slots[key] = "*"
-            else:
-                slots[key] = ml_val
-        else:
             slots[key] = "*"
+        else:
+            slots[key] = ml_val
 
     return slots
 
@@ -182,19 +228,8 @@ def generate_spl_query(slots, query=""):
     spl = f'search index={DEFAULT_INDEX}'
 
     # Add sourcetype based on source (more specific than source)
-    sourcetype_map = {
-        "web": "access_combined",  # Apache/nginx access logs
-        "auth": "syslog",           # Auth logs
-        "ssh": "syslog",            # SSH logs
-        "database": "database",     # DB logs
-        "filesystem": "syslog",     # Filesystem logs
-        "host": "syslog",           # Host logs
-        "firewall": "firewall",     # Firewall logs
-        "windows": "WinEventLog",   # Windows Event Logs
-    }
-
-    if source_type in sourcetype_map:
-        spl += f' sourcetype="{sourcetype_map[source_type]}"'
+    if source_type in SOURCETYPE_MAP:
+        spl += f' sourcetype="{SOURCETYPE_MAP[source_type]}"'
     elif source_type != "*":
         spl += f' sourcetype="{source_type}"'
 
@@ -224,26 +259,15 @@ def generate_spl_query(slots, query=""):
     if action and action not in (None, "*"):
         if source_type == "web":
             # For web logs, search in raw text rather than action field
-            action_keywords = {
-                "error": '(status>=400)',
-                "access": '*',  # All requests
-                "success": '(status>=200 status<400)',
-            }
-            if action in action_keywords and action_keywords[action] != '*':
-                spl += f' {action_keywords[action]}'
+            if action in WEB_ACTION_FILTERS and WEB_ACTION_FILTERS[action] != '*':
+                spl += f' {WEB_ACTION_FILTERS[action]}'
         elif source_type == "firewall":
             # Firewall logs use 'action' field
             spl += f' action="{action}"'
         elif source_type == "windows":
             # Windows Event Logs use EventCode
-            event_code_map = {
-                "failure": "4625",  # Failed login
-                "success": "4624",  # Successful login
-                "creation": "4720", # User created
-                "deletion": "4726", # User deleted
-            }
-            if action in event_code_map:
-                spl += f' EventCode="{event_code_map[action]}"'
+            if action in WINDOWS_EVENT_CODES:
+                spl += f' EventCode="{WINDOWS_EVENT_CODES[action]}"'
             else:
                 spl += f' (action="{action}" OR "{action}")'
         else:
@@ -258,24 +282,14 @@ def generate_spl_query(slots, query=""):
 
     # Time range
     if slots.get("time") and slots["time"] not in (None, "*"):
-        time_map = {
-            "last1h": "-1h",
-            "last24h": "-24h",
-            "last7d": "-7d@d",
-            "last30d": "-30d",
-            "last48h": "-48h",
-            "yesterday": "-1d@d",
-            "today": "@d"
-        }
-        if slots["time"] in time_map:
-            spl += f' earliest={time_map[slots["time"]]}'
+        if slots["time"] in TIME_MAP:
+            spl += f' earliest={TIME_MAP[slots["time"]]}'
 
     # --- Phase 3 enhancement: smarter NOC/Web context merge ---
-    noc_terms = ["critical", "crit", "warn", "warning", "alert"]
-    if any(term in query.lower() for term in noc_terms):
+    query_lower = query.lower()
+    if any(term in query_lower for term in NOC_TERMS):
         # If generated SPL already includes HTTP status codes, merge NOC terms
         if "(status>=" in spl:
-            import re
             spl = re.sub(
                 r'\(status>=(\d+)\)',
                 r'(status>=\1 OR status="CRIT" OR status="WARN" OR status="Critical" OR status="Warning") /* blended contexts */',
@@ -290,7 +304,6 @@ def generate_spl_query(slots, query=""):
                 1  # Only replace first occurrence
             )
             # Find position after the status code value and insert NOC terms
-            import re
             spl = re.sub(
                 r'status="(\d+)"',
                 r'(status="\1" OR status="CRIT" OR status="WARN" OR status="Critical" OR status="Warning") /* blended contexts */',
@@ -303,7 +316,6 @@ def generate_spl_query(slots, query=""):
 
     # --- Phase 3 field-awareness filter ---
     # Remove clauses for fields that don't exist in the active dataset schema
-    import re
     spl = re.sub(r'\s*\(log_level="[^"]*"\s+OR\s+severity="[^"]*"\)', '', spl)
 
     # --- Schema awareness cleanup ---
@@ -342,38 +354,18 @@ def generate_loose_spl(slots):
     """
     source_type = slots.get("source", "*")
 
-    sourcetype_map = {
-        "web": "access_combined",
-        "auth": "syslog",
-        "ssh": "syslog",
-        "database": "database",
-        "filesystem": "syslog",
-        "host": "syslog",
-        "firewall": "firewall",
-        "windows": "WinEventLog",
-    }
-
     spl = f'search index=*'
 
     # Add sourcetype
-    if source_type in sourcetype_map:
-        spl += f' sourcetype="{sourcetype_map[source_type]}"'
+    if source_type in SOURCETYPE_MAP:
+        spl += f' sourcetype="{SOURCETYPE_MAP[source_type]}"'
     elif source_type != "*":
         spl += f' sourcetype="{source_type}"'
 
     # Add time range
     if slots.get("time") and slots["time"] not in (None, "*"):
-        time_map = {
-            "last1h": "-1h",
-            "last24h": "-24h",
-            "last7d": "-7d@d",
-            "last30d": "-30d",
-            "last48h": "-48h",
-            "yesterday": "-1d@d",
-            "today": "@d"
-        }
-        if slots["time"] in time_map:
-            spl += f' earliest={time_map[slots["time"]]}'
+        if slots["time"] in TIME_MAP:
+            spl += f' earliest={TIME_MAP[slots["time"]]}'
 
     # Add raw text searches for key values
     search_terms = []
@@ -436,18 +428,7 @@ def main():
         print("\n=== DEBUGGING QUERIES ===")
         source_type = slots.get("source", "*")
 
-        sourcetype_map = {
-            "web": "access_combined",
-            "auth": "syslog",
-            "ssh": "syslog",
-            "database": "database",
-            "filesystem": "syslog",
-            "host": "syslog",
-            "firewall": "firewall",
-            "windows": "WinEventLog",
-        }
-
-        expected_sourcetype = sourcetype_map.get(source_type, source_type)
+        expected_sourcetype = SOURCETYPE_MAP.get(source_type, source_type)
 
         print("\n1. Check if any data exists with this sourcetype:")
         print(f'   index=* sourcetype="{expected_sourcetype}" | head 10')
@@ -469,17 +450,8 @@ def main():
         print("\n5. Simplified SPL (remove field filters, just search raw):")
         simple_spl = f'search index=* sourcetype="{expected_sourcetype}"'
         if slots.get("time") and slots["time"] != "*":
-            time_map = {
-                "last1h": "-1h",
-                "last24h": "-24h",
-                "last7d": "-7d@d",
-                "last30d": "-30d",
-                "last48h": "-48h",
-                "yesterday": "-1d@d",
-                "today": "@d"
-            }
-            if slots["time"] in time_map:
-                simple_spl += f' earliest={time_map[slots["time"]]}'
+            if slots["time"] in TIME_MAP:
+                simple_spl += f' earliest={TIME_MAP[slots["time"]]}'
 
         # Add raw text search for key values
         if slots.get("status_code") and slots["status_code"] != "*":
@@ -7,23 +7,28 @@ ml_parser.py
 Machine learning parser for natural language → Splunk SPL slot filling.
 
 - Loads dataset of NL queries and labeled slots
-- Trains per-slot classifiers (action, time, user, source)
+- Trains a multi-output classifier (one head per slot) over a shared TF-IDF matrix
 - Predicts slot values for a new query
 """
 
 from __future__ import annotations
 
-import csv
+import copy
+import functools
 import os
-import random
 import joblib
+from joblib import Parallel, delayed, parallel_config
 from pathlib import Path
 from typing import List, Optional
 
+import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
+from sklearn.multioutput import MultiOutputClassifier
 from sklearn.pipeline import Pipeline
 
+from dataset_io import read_csv_strings
+
 # ---------------------------------------------------------------------
 # Dataset path resolution (always points to smallAI/datasets/train_queries.csv)
 # ---------------------------------------------------------------------
@@ -44,6 +49,16 @@ MODEL_VERSION = "slot_models_v1"
 _vectorizer = None
 _slot_models = None
 
+# Queries are cut to this many characters before vectorizing; real queries are far shorter,
+# and it bounds tokenization cost for pasted payloads
+MAX_QUERY_CHARS = 4096
+
+# Training labels that mean "no value" for a slot
+_NULL_LABELS = frozenset({"none", "null", "nan", ""})
+
+# In-memory model used when no pre-trained models exist on disk
+_fallback_model = None
+
 def _load_models():
     """Lazy load vectorizer and slot models."""
     global _vectorizer, _slot_models
@@ -62,19 +77,42 @@ def _load_models():
     for slot in SLOTS:
         path = MODEL_DIR / f"model_{slot}.pkl"
         if path.exists():
-            _slot_models[slot] = joblib.load(path)
+            model = joblib.load(path)
+            # Fold null-like labels to None once, so predictions come back canonical
+            model.classes_ = np.array(
+                [None if _is_null_label(c) else c for c in model.classes_], dtype=object
+            )
+            _slot_models[slot] = model
         else:
             print(f"[WARN] No model found for slot '{slot}' — skipping.")
 
     return _vectorizer, _slot_models
 
 
+def reload_models():
+    """
+    Drop the loaded models, the in-memory fallback and every memoized parse_ml prediction,
+    so the next call reads models/ again. Call after models/*.pkl are retrained, replaced or removed.
+    """
+    global _vectorizer, _slot_models, _fallback_model
+
+    # The in-memory fallback stands in for missing models; it must not outlive new ones
+    _vectorizer = _slot_models = _fallback_model = None
+    _predict_normalized.cache_clear()
+
+
+def _is_null_label(label) -> bool:
+    return not label or str(label).lower() in _NULL_LABELS
+
+
 def load_dataset(filename: Optional[str] = None):
     """
     Load the training dataset of natural language queries and slot labels.
+    Parsed contents are cached per (path, mtime), so repeated training reuses them
+    until the CSV changes on disk.
     Returns:
-        X: list of NL queries
-        y_dict: dict with keys for each slot (action, time, user, source, src_ip, hostname, severity, status_code)
+        X: object ndarray of NL queries
+        y_dict: dict of object ndarrays keyed by slot (action, time, user, source, src_ip, hostname, severity, status_code)
     """
     path = filename or DATASET_FILE
     if not os.path.exists(path):
@@ -82,86 +120,151 @@ def load_dataset(filename: Optional[str] = None):
             f"Dataset not found at {path}. Ensure datasets/train_queries.csv exists under project root."
         )
 
-    X = []
-    y_dict = {
-        "action": [],
-        "time": [],
-        "user": [],
-        "source": [],
-        "src_ip": [],
-        "hostname": [],
-        "severity": [],
-        "status_code": []
-    }
-
-    with open(path, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for r in reader:
-            X.append(r["nl_query"].lower())  # normalize text to lowercase
-            y_dict["action"].append(r["action"])
-            y_dict["time"].append(r["time"])
-            y_dict["user"].append(r["user"])
-            y_dict["source"].append(r["source"])
-            y_dict["src_ip"].append(r["src_ip"])
-            y_dict["hostname"].append(r["hostname"])
-            y_dict["severity"].append(r["severity"])
-            y_dict["status_code"].append(r["status_code"])
-
-    return X, y_dict
-
-
-def train_classifier(X: List[str], y: List[str]) -> Pipeline:
-    """
-    Train a single slot classifier using TF-IDF + Logistic Regression.
+    X, y_dict = _read_dataset(os.path.abspath(path), os.path.getmtime(path))
+    # Hand out copies so callers can't mutate the cached columns
+    return X.copy(), {slot: vals.copy() for slot, vals in y_dict.items()}
+
+
+@functools.lru_cache(maxsize=4)
+def _read_dataset(path: str, mtime: float):
+    """Parse the dataset CSV; mtime is only part of the cache key."""
+    # Columnar C parse; empty cells stay "" like csv.DictReader gave
+    df = read_csv_strings(path, usecols=["nl_query", *SLOTS])
+
+    # sklearn takes ndarrays as-is instead of coercing lists inside fit
+    X = df["nl_query"].str.lower().to_numpy(dtype=object)  # normalize text to lowercase
+    return X, {slot: df[slot].to_numpy(dtype=object) for slot in SLOTS}
+
+
+def _slot_classifier() -> LogisticRegression:
+    """Per-slot head used by train_slot_model."""
+    # saga converges faster than lbfgs on these sparse features at this tolerance; it shuffles
+    # samples, so the seed is pinned. LogisticRegression's own n_jobs doesn't apply (multinomial),
+    # so parallelism stays across slots.
+    return LogisticRegression(solver="saga", max_iter=1000, tol=1e-3, random_state=0)
+
+
+def train_slot_model(X: List[str], y_dict: dict, n_jobs: int = -1,
+                     warm_start_from: Optional[Pipeline] = None) -> Pipeline:
+    """
+    Train one multi-output model covering every slot.
+
+    The TF-IDF matrix is fitted once and shared by one Logistic Regression per slot,
+    so prediction tokenizes the query a single time. Per-slot fits run across n_jobs workers.
+    X must already be lowercased (load_dataset and predict_query do this), so the
+    vectorizer skips its own lowercasing pass.
+
+    With warm_start_from (a model returned by an earlier train_slot_model / train_all), the
+    previous vocabulary is kept and each slot is refitted from its previous coefficients,
+    so retraining on similar data converges in a few iterations. Slots whose label set changed
+    are fitted from scratch. Terms not in the previous vocabulary are ignored; train cold
+    when the vocabulary should grow.
     """
+    if warm_start_from is not None:
+        return _warm_start_slot_model(X, y_dict, warm_start_from, n_jobs)
+
+    y_multi = np.column_stack([y_dict[slot] for slot in SLOTS])
+
+    # Word (1,2)-grams benchmarked best here: unigrams lose ~5pts hybrid exact-match,
+    # char_wb / word+char unions cost 2-3.5x predict time for no hybrid gain.
     pipe = Pipeline([
-        ("tfidf", TfidfVectorizer(ngram_range=(1, 2), max_features=3000)),
-        ("clf", LogisticRegression(max_iter=1000))
+        ("tfidf", TfidfVectorizer(ngram_range=(1, 2), max_features=3000, lowercase=False, dtype=np.float32)),
+        ("clf", MultiOutputClassifier(_slot_classifier(), n_jobs=n_jobs))
     ])
-    pipe.fit(X, y)
+    # Pin BLAS to one thread per worker to avoid oversubscription
+    with parallel_config(backend="loky", inner_max_num_threads=1):
+        pipe.fit(X, y_multi)
     return pipe
 
 
-def train_all(filename: Optional[str] = None):
+def _refit_head(previous, X_vec, y):
+    """Refit one slot head, starting from previous's coefficients when its classes still match."""
+    if set(np.unique(y)) == set(previous.classes_):
+        # saga rebuilds its gradient memory on every fit, so a warm start saves it nothing;
+        # lbfgs minimizes the same penalized loss and converges in a few steps from there
+        clf = copy.deepcopy(previous)
+        clf.set_params(warm_start=True, solver="lbfgs")
+        clf.fit(X_vec, y)
+        # Hand back the same estimator a cold fit builds, so later refits start from saga again
+        return clf.set_params(**_slot_classifier().get_params())
+    return _slot_classifier().fit(X_vec, y)
+
+
+def _warm_start_slot_model(X, y_dict, previous: Pipeline, n_jobs: int) -> Pipeline:
+    tfidf = previous.named_steps["tfidf"]
+    X_vec = tfidf.transform(X)
+    heads = previous.named_steps["clf"].estimators_
+
+    with parallel_config(backend="loky", inner_max_num_threads=1):
+        fitted = Parallel(n_jobs=n_jobs)(
+            delayed(_refit_head)(head, X_vec, y_dict[slot]) for slot, head in zip(SLOTS, heads)
+        )
+
+    # Same shape as a cold fit, so predict_batch / Pipeline.predict work unchanged
+    clf = MultiOutputClassifier(_slot_classifier(), n_jobs=n_jobs)
+    clf.estimators_ = fitted
+    clf.classes_ = [head.classes_ for head in fitted]
+    clf.n_features_in_ = X_vec.shape[1]
+    return Pipeline([("tfidf", copy.deepcopy(tfidf)), ("clf", clf)])
+
+
+def train_all(filename: Optional[str] = None, n_jobs: int = -1, seed: int = 42,
+              warm_start_from: Optional[Pipeline] = None) -> Pipeline:
     """
-    Train all eight classifiers (action, time, user, source, src_ip, hostname, severity, status_code).
-    Returns a dict of sklearn Pipelines.
+    Train the slot model for all eight slots (action, time, user, source, src_ip, hostname, severity, status_code).
+    Returns a single multi-output sklearn Pipeline (see train_slot_model, including warm_start_from).
     """
     X, y_dict = load_dataset(filename)
 
-    # Shuffle for randomness
-    indices = list(range(len(X)))
-    random.shuffle(indices)
-
-    X_shuffled = [X[i] for i in indices]
-    y_shuffled = {key: [vals[i] for i in indices] for key, vals in y_dict.items()}
+    # Shuffle with a seeded permutation so repeated training runs are reproducible
+    perm = np.random.default_rng(seed).permutation(len(X))
 
-    # Train one classifier per slot
-    classifiers = {}
-    for slot_name in ["action", "time", "user", "source", "src_ip", "hostname", "severity", "status_code"]:
-        classifiers[slot_name] = train_classifier(X_shuffled, y_shuffled[slot_name])
+    X_shuffled = X[perm]
+    y_shuffled = {key: vals[perm] for key, vals in y_dict.items()}
 
-    return classifiers
+    return train_slot_model(X_shuffled, y_shuffled, n_jobs=n_jobs, warm_start_from=warm_start_from)
 
 
-def predict_query(q: str, classifiers: dict) -> dict:
+def predict_query(q: str, model: Pipeline) -> dict:
     """
     Predict slot values for a given natural language query.
 
     Args:
         q: Natural language query
-        classifiers: Dict of trained Pipeline objects, one per slot
+        model: Trained multi-output Pipeline from train_slot_model / train_all
 
     Returns:
         Dict with predicted slot values
     """
-    q_lower = q.lower()
-    predictions = {}
+    return {slot: preds[0] for slot, preds in predict_batch([q], model).items()}
 
-    for slot_name, clf in classifiers.items():
-        predictions[slot_name] = clf.predict([q_lower])[0]
 
-    return predictions
+def predict_batch(queries: List[str], model: Pipeline) -> dict:
+    """
+    Predict slot values for many queries at once.
+
+    Args:
+        queries: Natural language queries
+        model: Trained multi-output Pipeline from train_slot_model / train_all
+
+    Returns:
+        Dict of {slot: ndarray of predicted values, one per query}
+    """
+    X_vec = model.named_steps["tfidf"].transform([q[:MAX_QUERY_CHARS].lower() for q in queries])
+    heads = model.named_steps["clf"].estimators_
+    return {slot: _linear_predict(clf, X_vec) for slot, clf in zip(SLOTS, heads)}
+
+
+def _linear_predict(clf, X_vec) -> np.ndarray:
+    """
+    Same labels as clf.predict(X_vec) for a fitted linear classifier, computed straight
+    from coef_/intercept_/classes_ to skip sklearn's per-call validation overhead.
+    """
+    scores = X_vec @ clf.coef_.T + clf.intercept_
+    if scores.shape[1] == 1:
+        # Binary: coef_ holds a single row scoring the positive class
+        return clf.classes_[(scores[:, 0] > 0).astype(int)]
+    return clf.classes_[scores.argmax(axis=1)]
 
 
 def parse_ml(query: str) -> dict:
@@ -169,7 +272,9 @@ def parse_ml(query: str) -> dict:
     Predict slot values for a given natural language query using pre-trained models.
 
     This function uses the models trained by scripts/train_ml_parser.py.
-    If models are not found, it falls back to training in-memory.
+    If models are not found, it falls back to training in-memory (once per process).
+    Predictions are memoized on the normalized query text, so repeated queries skip
+    vectorization and inference entirely.
 
     Args:
         query: Natural language query string
@@ -180,29 +285,37 @@ def parse_ml(query: str) -> dict:
     if not query or not query.strip():
         return {slot: None for slot in SLOTS}
 
+    # TF-IDF lowercases and ignores whitespace runs, so this key doesn't change predictions
+    normalized = " ".join(query[:MAX_QUERY_CHARS].lower().split())
+    return dict(_predict_normalized(normalized))
+
+
+@functools.lru_cache(maxsize=1024)
+def _predict_normalized(query: str) -> tuple:
+    """Cached worker for parse_ml; returns ((slot, value), ...) so entries stay immutable."""
+    global _fallback_model
+
     vectorizer, slot_models = _load_models()
 
     # If models don't exist, fall back to in-memory training
     if vectorizer is None or slot_models is None:
-        print("[INFO] Pre-trained models not found. Training in-memory...")
-        classifiers = train_all()
-        return predict_query(query, classifiers)
+        if _fallback_model is None:
+            print("[INFO] Pre-trained models not found. Training in-memory...")
+            _fallback_model = train_all()
+        return tuple(predict_query(query, _fallback_model).items())
 
     # Use pre-trained models
     X_vec = vectorizer.transform([query])
-    results = {}
+    results = []
 
     for slot, model in slot_models.items():
         try:
-            pred = model.predict(X_vec)[0]
-            if not pred or pred.lower() in ["none", "null", "nan", ""]:
-                pred = None
-            results[slot] = pred
+            results.append((slot, _linear_predict(model, X_vec)[0]))
         except Exception as e:
             print(f"[WARN] Prediction failed for slot '{slot}': {e}")
-            results[slot] = None
+            results.append((slot, None))
 
-    return results
+    return tuple(results)
 
 
 if __name__ == "__main__":
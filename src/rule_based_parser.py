@@ -1,13 +1,21 @@
 #!/usr/bin/env python3
 import os
 import re
-import csv
 import sys
+import functools
+from multiprocessing import Pool
+
+import pandas as pd
+
+from dataset_io import read_csv_strings
 
 # Always resolve dataset relative to this script's folder
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 DATASET_FILE = os.path.join(BASE_DIR, "datasets", "train_queries.csv")
 
+# Below this many rows, process start-up and pickling cost more than parsing in-process
+PARALLEL_MIN_ROWS = 20000
+
 # -------------------------------
 # Keyword dictionaries
 # -------------------------------
@@ -59,8 +67,73 @@ severity_keywords = {
 # NEW: Status code patterns
 status_code_pattern = r'\b(200|201|204|301|302|304|400|401|403|404|500|502|503|504)\b'
 
+# -------------------------------
+# Phrase tables (built once at import)
+# -------------------------------
+def _phrase_table(keyword_map):
+    """Flatten {value: [phrases]} into ((phrase, value), ...), keeping dict priority order."""
+    return tuple((phrase, value) for value, phrases in keyword_map.items() for phrase in phrases)
+
+_ACTION_PHRASES = _phrase_table(action_keywords)
+# These win over the whole time table (e.g. "since yesterday" must not read as "yesterday"),
+# so they go first; their duplicates further down could never be reached and are dropped
+_LAST24H_FIRST = ("since yesterday", "past day", "last day")
+_TIME_PHRASES = tuple((p, "last24h") for p in _LAST24H_FIRST) + tuple(
+    (phrase, value) for phrase, value in _phrase_table(time_keywords) if phrase not in _LAST24H_FIRST
+)
+_SOURCE_PHRASES = _phrase_table(source_keywords)
+_SEVERITY_PHRASES = _phrase_table(severity_keywords)
+
+# -------------------------------
+# Precompiled patterns
+# -------------------------------
+# Plain-literal action rules are substring checks; `in` is cheaper than a regex search
+_FAILURE_PHRASES = ("failed login", "login failure", "auth failure", "event 4625")
+_SUCCESS_PHRASES = ("successful login", "auth success", "event 4624")
+_CREATION_PHRASES = ("user creation", "created user", "event 4720")
+# Only match/no-match matters, so inflections already covered by their stem are left out
+_DENY_RE = re.compile(r"\bdeny|denie[sd]|block|drop|reject")
+_ALLOW_RE = re.compile(r"\ballow|allow(?:s|ed)|permit|accept")
+_LOGIN_RE = re.compile(r"\blogin(s)?\b")
+_LOGOUT_RE = re.compile(r"\blogout(s)?\b|sign off")
+_AUTH_RE = re.compile(r"authentication|authenticating|auth event")
+
+# Literals every match of the pattern above contains; when none is present the regex is skipped
+_DENY_HINTS = ("den", "block", "drop", "reject")
+_ALLOW_HINTS = ("allow", "permit", "accept")
+_LOGOUT_HINTS = ("logout", "sign off")
+
+# One pass for every known user; ties broken by position in `users`, like the old per-user loop
+_USER_RE = re.compile(r"\b(" + "|".join(map(re.escape, users)) + r")\b")
+_USER_RANK = {u: i for i, u in enumerate(users)}
+
+_IP_RE = re.compile(ip_pattern)
+_IP_CONTEXT_RE = re.compile(r'(?:from|ip|address)\s+(' + ip_pattern + ')')
+_HOSTNAME_RE = re.compile(r'(?:on|host|server)\s+([\w-]+)')
+_STATUS_RE = re.compile(status_code_pattern)
+_STATUS_CONTEXT_RE = re.compile(r'(?:status|code|http)\s*' + status_code_pattern)
+
+def _has_phrase(text, phrases):
+    """True if any of the literal phrases occurs in text."""
+    for phrase in phrases:
+        if phrase in text:
+            return True
+    return False
+
+def _match_phrase(text, phrases):
+    """Return the value of the highest-priority phrase found in text, or "*"."""
+    for phrase, value in phrases:
+        if phrase in text:
+            return value
+    return "*"
+
 def parse_query(nl_query: str):
-    text = nl_query.lower()
+    # Every rule matches on lowercased text, so that is the cache key; callers get a fresh dict
+    return dict(_parse_lowered(nl_query.lower()))
+
+@functools.lru_cache(maxsize=8192)
+def _parse_lowered(text: str) -> tuple:
+    """Cached worker for parse_query; returns ((slot, value), ...) so entries stay immutable."""
     parsed = {
         "action": "*",
         "time": "*",
@@ -73,85 +146,66 @@ def parse_query(nl_query: str):
     }
 
     # Action extraction (check specific patterns first)
-    if re.search(r"failed login|login failure|auth failure|event 4625", text):
+    if _has_phrase(text, _FAILURE_PHRASES):
         parsed["action"] = "failure"
-    elif re.search(r"successful login|auth success|event 4624", text):
+    elif _has_phrase(text, _SUCCESS_PHRASES):
         parsed["action"] = "success"
-    elif re.search(r"\bdeny|denies|denied|block|blocks|blocked|drop|dropped|reject", text):
+    elif _has_phrase(text, _DENY_HINTS) and _DENY_RE.search(text):
         parsed["action"] = "deny"
-    elif re.search(r"\ballow|allows|allowed|permit|permits|permitted|accept|accepts|accepted", text):
+    elif _has_phrase(text, _ALLOW_HINTS) and _ALLOW_RE.search(text):
         parsed["action"] = "allow"
-    elif re.search(r"user creation|created user|event 4720", text):
+    elif _has_phrase(text, _CREATION_PHRASES):
         parsed["action"] = "creation"
-    elif re.search(r"\blogin(s)?\b", text) and "upload" not in text:
+    elif "login" in text and _LOGIN_RE.search(text) and "upload" not in text:
         parsed["action"] = "login"
-    elif re.search(r"\blogout(s)?\b|sign off", text):
+    elif _has_phrase(text, _LOGOUT_HINTS) and _LOGOUT_RE.search(text):
         parsed["action"] = "logout"
-    elif re.search(r"authentication|authenticating|auth event", text):
+    elif "auth" in text and _AUTH_RE.search(text):
         parsed["action"] = "login"
     else:
-        for act, keywords in action_keywords.items():
-            if any(kw in text for kw in keywords):
-                parsed["action"] = act
-                break
+        parsed["action"] = _match_phrase(text, _ACTION_PHRASES)
 
     # Time extraction
-    if re.search(r"since yesterday|past day|last day", text):
-        parsed["time"] = "last24h"
-    else:
-        for t, keywords in time_keywords.items():
-            if any(kw in text for kw in keywords):
-                parsed["time"] = t
-                break
+    parsed["time"] = _match_phrase(text, _TIME_PHRASES)
 
     # User extraction
-    for u in users:
-        if re.search(rf"\b{u}\b", text):
-            parsed["user"] = u
-            break
+    users_found = _USER_RE.findall(text)
+    if users_found:
+        parsed["user"] = min(users_found, key=_USER_RANK.__getitem__)
 
     # Source extraction
-    for s, keywords in source_keywords.items():
-        if any(kw in text for kw in keywords):
-            parsed["source"] = s
-            break
-
-    # NEW: IP extraction
-    ip_match = re.search(r'(?:from|ip|address)\s+' + ip_pattern, text)
-    if ip_match:
-        ip_addr = re.search(ip_pattern, ip_match.group())
-        if ip_addr:
-            parsed["src_ip"] = ip_addr.group()
-    else:
-        # Try to find any IP in the text
-        ip_match = re.search(ip_pattern, text)
+    parsed["source"] = _match_phrase(text, _SOURCE_PHRASES)
+
+    # NEW: IP extraction (a dotted quad needs three dots; most queries have none)
+    if text.count(".") >= 3:
+        ip_match = _IP_CONTEXT_RE.search(text)
         if ip_match:
-            parsed["src_ip"] = ip_match.group()
+            parsed["src_ip"] = ip_match.group(1)
+        else:
+            # Try to find any IP in the text
+            ip_match = _IP_RE.search(text)
+            if ip_match:
+                parsed["src_ip"] = ip_match.group()
 
     # NEW: Hostname extraction
-    hostname_match = re.search(r'(?:on|host|server)\s+([\w-]+)', text)
+    hostname_match = _HOSTNAME_RE.search(text)
     if hostname_match:
         parsed["hostname"] = hostname_match.group(1)
 
     # NEW: Severity extraction
-    for sev, keywords in severity_keywords.items():
-        if any(kw in text for kw in keywords):
-            parsed["severity"] = sev
-            break
+    parsed["severity"] = _match_phrase(text, _SEVERITY_PHRASES)
 
     # NEW: Status code extraction
-    status_match = re.search(r'(?:status|code|http)\s*' + status_code_pattern, text)
+    status_match = _STATUS_CONTEXT_RE.search(text)
     if status_match:
-        code = re.search(status_code_pattern, status_match.group())
-        if code:
-            parsed["status_code"] = code.group()
+        parsed["status_code"] = status_match.group(1)
     else:
         # Try to find standalone status codes
-        status_match = re.search(status_code_pattern, text)
+        status_match = _STATUS_RE.search(text)
         if status_match:
             parsed["status_code"] = status_match.group()
 
-    return parsed
+    return tuple(parsed.items())
 
 # Wrapper so hybrid_parser can import the expected function
 def parse_rule_based(query: str) -> dict:
@@ -175,39 +229,44 @@ def structured_string(parsed: dict):
         parts.append(f"status_code={parsed['status_code']}")
     return " ".join(parts)
 
+def parse_batch(queries):
+    """parse_query over a list, fanned out to worker processes for large inputs."""
+    workers = os.cpu_count() or 1
+    if len(queries) < PARALLEL_MIN_ROWS or workers < 2:
+        return [parse_query(q) for q in queries]
+    with Pool(workers) as pool:
+        return pool.map(parse_query, queries, chunksize=512)
+
 def evaluate(dataset=DATASET_FILE, show_fails=10):
-    with open(dataset, newline="") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-
-    total = len(rows)
-    exact = 0
-    field_correct = {"action": 0, "time": 0, "user": 0, "source": 0, "src_ip": 0, "hostname": 0, "severity": 0, "status_code": 0}
-    failures = []
-
-    for row in rows:
-        parsed = parse_query(row["nl_query"])
-        predicted = structured_string(parsed)
-        gold = row["structured_query"]
-
-        if predicted == gold:
-            exact += 1
-        else:
-            if len(failures) < show_fails:
-                failures.append({
-                    "nl_query": row["nl_query"],
-                    "predicted": predicted,
-                    "gold": gold
-                })
+    # Strings throughout, so empty gold cells compare as "" like csv.DictReader gave
+    df = read_csv_strings(dataset)
+
+    total = len(df)
+    fields = ["action", "time", "user", "source", "src_ip", "hostname", "severity", "status_code"]
+
+    # Rules still run per query (memoized); scoring is done column-wise
+    parsed = pd.DataFrame(parse_batch(df["nl_query"].tolist()), columns=fields, index=df.index)
+    predicted = pd.Series([structured_string(p) for p in parsed.to_dict("records")], index=df.index)
+    matched = predicted == df["structured_query"]
+
+    exact = int(matched.sum())
+    field_correct = (parsed == df[fields]).sum()
 
-        for field in field_correct:
-            if parsed[field] == row[field]:
-                field_correct[field] += 1
+    failed = df.index[~matched][:show_fails]
+    failures = [
+        {
+            "nl_query": df.at[i, "nl_query"],
+            "predicted": predicted[i],
+            "gold": df.at[i, "structured_query"],
+        }
+        for i in failed
+    ]
 
     print(f"Evaluated {total} queries")
     print(f"Exact matches: {exact} / {total} = {exact/total:.2%}")
     print("\nPer-field accuracy:")
-    for field, correct in field_correct.items():
+    for field in fields:
+        correct = int(field_correct[field])
         print(f"  {field:6s}: {correct} / {total} = {correct/total:.2%}")
 
     if failures:
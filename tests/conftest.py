@@ -0,0 +1,9 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Parsers live in src/, standalone tools in scripts/, drift_hook at the repo root
+for path in (ROOT, ROOT / "src", ROOT / "scripts"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+
+from dataset_io import read_csv_strings
+
+
+def _write(tmp_path, text):
+    path = tmp_path / "data.csv"
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def _records(df):
+    return [{k: (None if pd.isna(v) else v) for k, v in row.items()} for row in df.to_dict("records")]
+
+
+def test_well_formed_file(tmp_path):
+    path = _write(tmp_path, 'a,b,c\n1,,"x, y"\n\n4,5,6\n')
+    assert _records(read_csv_strings(path)) == [
+        {"a": "1", "b": "", "c": "x, y"},
+        {"a": "4", "b": "5", "c": "6"},
+    ]
+
+
+@pytest.mark.parametrize("text, expected", [
+    # Long row after the first: pandas raises ParserError
+    ("a,b,c\n1,2,3\n4,5,6,7\n", [("1", "2", "3"), ("4", "5", "6")]),
+    # Long first row: pandas would shift the columns into an implicit index
+    ("a,b,c\n1,2,3,4\n5,6,7\n", [("1", "2", "3"), ("5", "6", "7")]),
+    ("a,b,c\n1,2,3,\n5,6,7,\n", [("1", "2", "3"), ("5", "6", "7")]),
+    ('a,b,c\n1,2,3,"4,5",6\n7,8\n', [("1", "2", "3"), ("7", "8", None)]),
+])
+def test_long_rows_keep_the_named_fields(tmp_path, text, expected):
+    df = read_csv_strings(_write(tmp_path, text))
+    assert list(df.columns) == ["a", "b", "c"]
+    assert _records(df) == [dict(zip("abc", row)) for row in expected]
+
+
+def test_usecols_on_ragged_file(tmp_path):
+    df = read_csv_strings(_write(tmp_path, "a,b,c\n1,2,3,4\n"), usecols=["c", "a"])
+    assert _records(df) == [{"a": "1", "c": "3"}]
+
+    with pytest.raises(ValueError):
+        read_csv_strings(_write(tmp_path, "a,b,c\n1,2,3,4\n"), usecols=["a", "z"])
+
+
+def test_empty_file(tmp_path):
+    with pytest.raises(pd.errors.EmptyDataError):
+        read_csv_strings(_write(tmp_path, ""))
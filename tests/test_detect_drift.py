@@ -0,0 +1,150 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.spatial.distance import cosine, jensenshannon
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+import detect_drift
+from detect_drift import compute_slot_distribution_drift, compute_tfidf_drift, js_divergence, kl_divergence
+
+TRAIN = [
+    "show failed logins from yesterday",
+    "count 500 errors in nginx logs",
+    "list ssh connection failures for host server-1",
+]
+
+
+def test_tfidf_drift_identical_queries():
+    result = compute_tfidf_drift(TRAIN, TRAIN)
+
+    assert result["status"] == "ok"
+    assert result["cosine_distance"] == pytest.approx(0.0, abs=1e-12)
+    # Overlap compares whitespace tokens with the fitted vocabulary: "server-1" is tokenized
+    # as "server" (single characters are dropped), so 17 of the 18 tokens are known
+    assert result["vocabulary_overlap"] == pytest.approx(17 / 18)
+
+
+def test_tfidf_drift_partial_overlap():
+    # Fitted on the training queries: "ssh" and "logins" are known, "kernel" and "panic" are not.
+    # Each new query then keeps a single term, so the new mean vector is 0.5 * (e_ssh + e_logins),
+    # and the overlap counts whitespace tokens: {ssh, logins} of {ssh, kernel, logins, panic}.
+    result = compute_tfidf_drift(TRAIN, ["ssh kernel", "logins panic"])
+
+    assert result["vocabulary_overlap"] == 0.5
+
+    # Reference: scipy's cosine distance between the mean TF-IDF vectors
+    vectorizer = TfidfVectorizer(max_features=1000)
+    train_mean = vectorizer.fit_transform(TRAIN).mean(axis=0).A1
+    new_mean = vectorizer.transform(["ssh kernel", "logins panic"]).mean(axis=0).A1
+    assert result["cosine_distance"] == pytest.approx(cosine(train_mean, new_mean))
+    # By hand: every training term has the same IDF, so each training row is uniform over its
+    # 5, 6 and 7 terms; cos = 0.5 * (1/sqrt(5) + 1/sqrt(7)) / (sqrt(1/2) * sqrt(3)) = 0.33688
+    assert result["cosine_distance"] == pytest.approx(0.66312, abs=1e-5)
+
+
+@pytest.mark.filterwarnings("ignore:invalid value encountered")
+def test_tfidf_drift_disjoint_vocabulary_is_nan():
+    # Nothing in the new queries is in the fitted vocabulary: the new mean vector is all zeros
+    result = compute_tfidf_drift(TRAIN, ["kernel panic", "oom killer"])
+
+    assert math.isnan(result["cosine_distance"])
+    assert result["vocabulary_overlap"] == 0.0
+
+
+@pytest.mark.filterwarnings("ignore:invalid value encountered")
+def test_tfidf_drift_vocabulary_is_capped_at_1000_terms():
+    train = [f"term{i}" for i in range(1500)]
+    # Every training term occurs once, so the cap keeps the first 1000 in sorted order
+    kept = sorted(train)[:1000]
+    dropped = sorted(train)[1000:]
+
+    assert compute_tfidf_drift(train, kept[:10])["vocabulary_overlap"] == 1.0
+    assert compute_tfidf_drift(train, dropped[:10])["vocabulary_overlap"] == 0.0
+
+
+def test_tfidf_drift_insufficient_data():
+    assert compute_tfidf_drift([], TRAIN) == {
+        "cosine_distance": None, "vocabulary_overlap": None, "status": "insufficient_data",
+    }
+
+
+@pytest.mark.parametrize("new", [
+    ["show failed logins", "count 500 errors"],
+    ["ssh connection failures for host server-1 from yesterday"],
+    ["nginx logs nginx logs nginx logs", "show yesterday"],
+])
+def test_tfidf_cosine_distance_is_bit_identical_to_scipy(new):
+    vectorizer = TfidfVectorizer(max_features=1000)
+    train_mean = vectorizer.fit_transform(TRAIN).mean(axis=0).A1
+    new_mean = vectorizer.transform(new).mean(axis=0).A1
+
+    assert compute_tfidf_drift(TRAIN, new)["cosine_distance"] == float(cosine(train_mean, new_mean))
+
+
+def test_kl_divergence_hand_computed():
+    # 0.5 * ln(0.5 / 0.25) + 0.5 * ln(0.5 / 0.75)
+    assert kl_divergence(np.array([0.5, 0.5]), np.array([0.25, 0.75])) == pytest.approx(0.1438410362, rel=1e-8)
+    # Inputs are normalized first, and neither is modified
+    p, q = np.array([2.0, 2.0]), np.array([1.0, 3.0])
+    assert kl_divergence(p, q) == pytest.approx(0.1438410362, rel=1e-8)
+    assert p.tolist() == [2.0, 2.0] and q.tolist() == [1.0, 3.0]
+
+
+def test_js_divergence_hand_computed():
+    # Disjoint supports: JS reaches its maximum, ln 2
+    assert js_divergence(np.array([1.0, 0.0]), np.array([0.0, 1.0])) == pytest.approx(math.log(2), rel=1e-8)
+    assert js_divergence(np.array([0.3, 0.7]), np.array([0.3, 0.7])) == pytest.approx(0.0, abs=1e-12)
+    # Reference: scipy's Jensen-Shannon distance is the square root of the divergence
+    p, q = np.array([0.5, 0.25, 0.25]), np.array([0.25, 0.5, 0.25])
+    assert js_divergence(p, q) == pytest.approx(jensenshannon(p, q) ** 2, rel=1e-8)
+
+
+def test_slot_distribution_drift_aligns_values_from_both_sides():
+    train = pd.DataFrame({"action": ["login", "login", "failure", None], "time": ["today"] * 4})
+    new = pd.DataFrame({"action": ["login", "failure", "failure", "error"], "time": ["today"] * 4})
+
+    result = compute_slot_distribution_drift(train, new, ["action", "time", "user"])
+
+    # Aligned over {*, error, failure, login}; missing cells count as "*"
+    p = np.array([0.25, 0.0, 0.25, 0.5])   # train
+    q = np.array([0.0, 0.25, 0.5, 0.25])   # new
+    assert result["action"]["status"] == "ok"
+    # (the epsilon smoothing of zero cells shifts JS by ~1e-9)
+    assert result["action"]["js_divergence"] == pytest.approx(jensenshannon(p, q) ** 2, rel=1e-7)
+    eps = 1e-10
+    pe, qe = (p + eps) / (p + eps).sum(), (q + eps) / (q + eps).sum()
+    assert result["action"]["kl_divergence"] == pytest.approx(float(np.sum(qe * np.log(qe / pe))), rel=1e-8)
+
+    assert result["time"] == {"kl_divergence": pytest.approx(0.0, abs=1e-12),
+                              "js_divergence": pytest.approx(0.0, abs=1e-12), "status": "ok"}
+    assert result["user"] == {"kl_divergence": None, "js_divergence": None, "status": "missing"}
+
+
+def test_detect_drift_reads_only_query_and_slot_columns(tmp_path, monkeypatch):
+    monkeypatch.setattr(detect_drift, "DRIFT_LOG", tmp_path / "drift_report.log")
+    train_csv = tmp_path / "train.csv"
+    new_csv = tmp_path / "new.csv"
+    train_csv.write_text(
+        "nl_query,action,time,user,source,src_ip,hostname,severity,status_code,structured_query,event_ts\n"
+        "show failed logins,failure,today,*,auth,*,*,*,*,x,2025-01-01\n"
+        "count 500 errors,error,last24h,*,web,*,*,*,500,x,2025-01-02\n"
+    )
+    # No status_code column, plus an unrelated extra column
+    new_csv.write_text(
+        "extra,nl_query,action,time,user,source,src_ip,hostname,severity\n"
+        "1,show failed logins,failure,today,*,auth,*,*,*\n"
+        "2,count 0500 errors,error,today,*,web,*,*,*\n"
+    )
+
+    results = detect_drift.detect_drift(str(train_csv), str(new_csv), str(tmp_path / "out" / "report.json"))
+
+    assert (results["train_size"], results["new_size"]) == (2, 2)
+    slots = results["metrics"]["slot_distributions"]
+    assert slots["status_code"] == {"kl_divergence": None, "js_divergence": None, "status": "missing"}
+    assert slots["action"]["js_divergence"] == pytest.approx(0.0, abs=1e-12)
+    # time: train {today, last24h}, new {today, today}
+    assert slots["time"]["js_divergence"] == pytest.approx(jensenshannon([0.5, 0.5], [0.0, 1.0]) ** 2, rel=1e-7)
+    assert (tmp_path / "out" / "report.json").exists()
+    assert "OVERALL DRIFT:" in (tmp_path / "drift_report.log").read_text()
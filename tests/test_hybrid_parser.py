@@ -0,0 +1,69 @@
+import joblib
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+import hybrid_parser
+import ml_parser
+
+QUERY = "show failed logins from yesterday in auth"
+
+
+@pytest.fixture
+def models_dir(tmp_path, monkeypatch):
+    """An empty models/ for hybrid_parser, with nothing cached on either side of the test."""
+    monkeypatch.setattr(hybrid_parser, "MODELS_DIR", tmp_path)
+    monkeypatch.setattr(hybrid_parser, "MODEL_FILE", tmp_path / "slot_classifier.joblib")
+    monkeypatch.setattr(hybrid_parser, "LEGACY_MODEL_FILES",
+                        {slot: tmp_path / f"{slot}_classifier.joblib" for slot in ml_parser.SLOTS})
+    monkeypatch.setattr(hybrid_parser, "_MODELS_CACHE", None)
+    return tmp_path
+
+
+def _write_legacy_models():
+    """Per-slot pipelines as the old train_classifier built them, labels prefixed with "legacy-"."""
+    X, y = ml_parser.load_dataset()
+    for slot, path in hybrid_parser.LEGACY_MODEL_FILES.items():
+        pipe = Pipeline([
+            ("tfidf", TfidfVectorizer(ngram_range=(1, 2), max_features=3000)),
+            ("clf", LogisticRegression(max_iter=1000)),
+        ])
+        joblib.dump(pipe.fit(X, [f"legacy-{v}" for v in y[slot]]), path)
+
+
+def test_load_models_without_model_files(models_dir):
+    assert hybrid_parser.load_models() is None
+    assert hybrid_parser.ml_predict_slots(QUERY) == {}
+
+
+def test_load_models_falls_back_to_legacy_per_slot_files(models_dir, capsys):
+    _write_legacy_models()
+
+    models = hybrid_parser.load_models()
+    assert isinstance(models, dict) and list(models) == ml_parser.SLOTS
+    assert "[WARN] Using legacy per-slot models" in capsys.readouterr().out
+
+    assert hybrid_parser.ml_predict_slots(QUERY.upper()) == {
+        "action": "legacy-failure", "time": "legacy-yesterday", "user": "legacy-*", "source": "legacy-auth",
+        "src_ip": "legacy-*", "hostname": "legacy-*", "severity": "legacy-*", "status_code": "legacy-*",
+    }
+
+
+def test_legacy_files_need_every_slot(models_dir):
+    _write_legacy_models()
+    hybrid_parser.LEGACY_MODEL_FILES["severity"].unlink()
+    assert hybrid_parser.load_models() is None
+
+
+def test_model_file_takes_precedence_over_legacy_files(models_dir, capsys):
+    _write_legacy_models()
+    X, y = ml_parser.load_dataset()
+    hybrid_parser.save_models(ml_parser.train_slot_model(X, y, n_jobs=1))
+
+    assert not isinstance(hybrid_parser.load_models(), dict)
+    assert "legacy" not in capsys.readouterr().out
+    assert hybrid_parser.ml_predict_slots(QUERY) == {
+        "action": "failure", "time": "yesterday", "user": "*", "source": "auth",
+        "src_ip": "*", "hostname": "*", "severity": "*", "status_code": "*",
+    }
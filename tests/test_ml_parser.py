@@ -0,0 +1,169 @@
+import copy
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pytest
+
+from sklearn.linear_model import LogisticRegression
+
+import ml_parser
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def test_load_dataset_reads_rows_longer_than_the_header():
+    X, y = ml_parser.load_dataset(str(FIXTURES / "ragged_queries.csv"))
+
+    assert len(X) == 8
+    assert X[0] == "find login failure events by user root from ip 10.10.10.5 on db-prod-02 this month in secure shell"
+    assert [y[slot][0] for slot in ml_parser.SLOTS] == [
+        "failure", "last30d", "root", "ssh", "10.10.10.5", "db-prod-02", "*", "*",
+    ]
+    # Row 5 has two extra fields after event_ts; the slots are unaffected
+    assert [y[slot][4] for slot in ml_parser.SLOTS] == [
+        "login", "last7d", "root", "auth", "10.0.0.1", "app-server-03", "*", "*",
+    ]
+
+
+QUERY = "show failed logins from yesterday in auth"
+
+
+@pytest.fixture(scope="module")
+def slot_model():
+    X, y = ml_parser.load_dataset()
+    return ml_parser.train_slot_model(X, y, n_jobs=1)
+
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    """An empty models/ for parse_ml, with nothing loaded or memoized on either side of the test."""
+    monkeypatch.setattr(ml_parser, "MODEL_DIR", tmp_path)
+    ml_parser.reload_models()
+    yield tmp_path
+    ml_parser.reload_models()
+
+
+def _write_pkl_models(model_dir, model, relabel=None):
+    """Save model the way scripts/train_ml_parser.py does, optionally renaming every class label."""
+    joblib.dump(model.named_steps["tfidf"], model_dir / "vectorizer.pkl")
+    for slot, head in zip(ml_parser.SLOTS, model.named_steps["clf"].estimators_):
+        head = copy.deepcopy(head)
+        if relabel:
+            head.classes_ = np.array([relabel(c) for c in head.classes_], dtype=object)
+        joblib.dump(head, model_dir / f"model_{slot}.pkl")
+
+
+def test_parse_ml_memoizes_on_normalized_text(model_dir, slot_model):
+    _write_pkl_models(model_dir, slot_model)
+
+    first = ml_parser.parse_ml(QUERY)
+    again = ml_parser.parse_ml("  SHOW failed   logins from Yesterday in AUTH ")
+
+    assert first == again
+    assert first["action"] == "failure" and first["time"] == "yesterday" and first["source"] == "auth"
+    info = ml_parser._predict_normalized.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_reload_models_picks_up_replaced_pkl_files(model_dir, slot_model):
+    _write_pkl_models(model_dir, slot_model)
+    assert ml_parser.parse_ml(QUERY)["action"] == "failure"
+
+    _write_pkl_models(model_dir, slot_model, relabel=lambda c: f"v2-{c}")
+    assert ml_parser.parse_ml(QUERY)["action"] == "failure"  # memoized until told otherwise
+
+    ml_parser.reload_models()
+    assert ml_parser.parse_ml(QUERY)["action"] == "v2-failure"
+
+
+def test_reload_models_drops_the_in_memory_fallback(model_dir, slot_model, monkeypatch):
+    # No models on disk: parse_ml serves the in-memory fallback model
+    monkeypatch.setattr(ml_parser, "_fallback_model", slot_model)
+    assert ml_parser.parse_ml(QUERY)["action"] == "failure"
+
+    _write_pkl_models(model_dir, slot_model, relabel=lambda c: f"disk-{c}")
+    ml_parser.reload_models()
+
+    assert ml_parser._fallback_model is None
+    assert ml_parser.parse_ml(QUERY)["action"] == "disk-failure"
+
+
+def test_warm_start_matches_a_cold_fit(slot_model):
+    X, y = ml_parser.load_dataset()
+    warm = ml_parser.train_slot_model(X, y, n_jobs=1, warm_start_from=slot_model)
+
+    cold_preds = ml_parser.predict_batch(X, slot_model)
+    warm_preds = ml_parser.predict_batch(X, warm)
+    for slot in ml_parser.SLOTS:
+        assert np.mean(cold_preds[slot] == warm_preds[slot]) >= 0.99, slot
+
+    assert ml_parser.predict_query(QUERY, warm) == ml_parser.predict_query(QUERY, slot_model) == {
+        "action": "failure", "time": "yesterday", "user": "*", "source": "auth",
+        "src_ip": "*", "hostname": "*", "severity": "*", "status_code": "*",
+    }
+
+    # Same shape and estimator as a cold fit, ready for the next warm start
+    clf = warm.named_steps["clf"]
+    assert [list(c) for c in clf.classes_] == [list(c) for c in slot_model.named_steps["clf"].classes_]
+    assert all(head.get_params() == ml_parser._slot_classifier().get_params() for head in clf.estimators_)
+    assert warm.predict_proba([QUERY])[0].shape == slot_model.predict_proba([QUERY])[0].shape
+
+
+def test_warm_start_refits_a_slot_cold_when_its_labels_change(slot_model):
+    X, y = ml_parser.load_dataset()
+    y["severity"] = np.where(y["severity"] == "*", "none-given", y["severity"])
+    warm = ml_parser.train_slot_model(X, y, n_jobs=1, warm_start_from=slot_model)
+
+    classes = dict(zip(ml_parser.SLOTS, warm.named_steps["clf"].classes_))
+    assert "none-given" in classes["severity"] and "*" not in classes["severity"]
+    assert ml_parser.predict_query(QUERY, warm)["severity"] == "none-given"
+
+
+def test_linear_predict_matches_predict_for_multiclass_heads(slot_model):
+    X, _ = ml_parser.load_dataset()
+    X_vec = slot_model.named_steps["tfidf"].transform(X)
+
+    for slot, head in zip(ml_parser.SLOTS, slot_model.named_steps["clf"].estimators_):
+        assert len(head.classes_) > 2, slot
+        np.testing.assert_array_equal(ml_parser._linear_predict(head, X_vec), head.predict(X_vec), err_msg=slot)
+
+
+def test_linear_predict_matches_predict_for_a_binary_head(slot_model):
+    # No slot in the dataset has two labels, so fit one: coef_ then has a single row
+    X, y = ml_parser.load_dataset()
+    X_vec = slot_model.named_steps["tfidf"].transform(X)
+    head = LogisticRegression().fit(X_vec, np.where(y["action"] == "failure", "failure", "other"))
+
+    assert head.coef_.shape[0] == 1
+    predicted = ml_parser._linear_predict(head, X_vec)
+    np.testing.assert_array_equal(predicted, head.predict(X_vec))
+    assert set(predicted) == {"failure", "other"}
+
+
+@pytest.mark.parametrize("null_label", ["none", "NULL", "NaN", ""])
+def test_parse_ml_folds_null_like_labels_to_none(model_dir, slot_model, null_label):
+    # Models whose "no value" class was saved under a null-like name instead of "*"
+    _write_pkl_models(model_dir, slot_model, relabel=lambda c: null_label if c == "*" else c)
+
+    assert ml_parser.parse_ml(QUERY) == {
+        "action": "failure", "time": "yesterday", "user": None, "source": "auth",
+        "src_ip": None, "hostname": None, "severity": None, "status_code": None,
+    }
+
+
+def test_text_past_max_query_chars_is_ignored(model_dir, slot_model, monkeypatch):
+    _write_pkl_models(model_dir, slot_model)
+    head = ((QUERY + " ") * 200)[:ml_parser.MAX_QUERY_CHARS]
+    query = head + " download files from the web server by bob with status 404 last hour" * 300
+    expected = {
+        "action": "failure", "time": "yesterday", "user": "*", "source": "auth",
+        "src_ip": "*", "hostname": "*", "severity": "*", "status_code": "*",
+    }
+
+    assert ml_parser.predict_query(query, slot_model) == ml_parser.predict_query(head, slot_model) == expected
+    assert ml_parser.parse_ml(query) == ml_parser.parse_ml(head) == expected
+
+    # Uncapped, the tail outweighs the head
+    monkeypatch.setattr(ml_parser, "MAX_QUERY_CHARS", len(query))
+    assert ml_parser.predict_query(query, slot_model)["action"] == "download"
@@ -0,0 +1,94 @@
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import normalize_dataset
+from normalize_dataset import process
+
+FIXTURES = Path(__file__).parent / "fixtures" / "normalize"
+
+
+def _run(tmp_path, fixture="dataset.csv", **kwargs):
+    dataset = tmp_path / "dataset.csv"
+    shutil.copyfile(FIXTURES / fixture, dataset)
+    process(dataset, FIXTURES / "schema.yaml", **kwargs)
+    return dataset
+
+
+def _report_body(dataset):
+    # Line 3 is the generation timestamp
+    lines = Path(f"{dataset}.normalize_report.txt").read_text(encoding="utf-8").splitlines(keepends=True)
+    assert lines[0] == f"Normalization report for {dataset}\n"
+    assert lines[1] == f"Schema: {FIXTURES / 'schema.yaml'}\n"
+    assert lines[2].startswith("Generated: ")
+    return "".join(lines[3:])
+
+
+def test_dry_run_report_and_dataset_untouched(tmp_path):
+    dataset = _run(tmp_path)
+
+    assert _report_body(dataset) == (FIXTURES / "expected_report.txt").read_text(encoding="utf-8")
+    assert dataset.read_bytes() == (FIXTURES / "dataset.csv").read_bytes()
+    assert not list(tmp_path.glob("dataset.csv.backup.*"))
+
+
+def test_apply_writes_normalized_dataset_and_backup(tmp_path):
+    dataset = _run(tmp_path, apply_changes=True)
+
+    assert _report_body(dataset) == (FIXTURES / "expected_report.txt").read_text(encoding="utf-8")
+    assert dataset.read_bytes() == (FIXTURES / "expected_dataset.csv").read_bytes()
+    [backup] = tmp_path.glob("dataset.csv.backup.*")
+    assert backup.read_bytes() == (FIXTURES / "dataset.csv").read_bytes()
+    assert not (tmp_path / "dataset.csv.tmp").exists()
+
+
+def test_dry_run_reports_rows_longer_than_the_header(tmp_path):
+    # Rows 3 and 9 carry an extra field; the slots they report on are unaffected
+    dataset = _run(tmp_path, fixture="dataset_long_rows.csv")
+
+    assert _report_body(dataset) == (FIXTURES / "expected_report.txt").read_text(encoding="utf-8")
+    assert dataset.read_bytes() == (FIXTURES / "dataset_long_rows.csv").read_bytes()
+
+
+def test_apply_refuses_rows_longer_than_the_header(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exc:
+        _run(tmp_path, fixture="dataset_long_rows.csv", apply_changes=True)
+
+    assert exc.value.code == 4
+    assert "2 row(s) have more fields than the header (rows 3, 9)" in capsys.readouterr().out
+    assert (tmp_path / "dataset.csv").read_bytes() == (FIXTURES / "dataset_long_rows.csv").read_bytes()
+    assert not list(tmp_path.glob("dataset.csv.backup.*"))
+    assert not (tmp_path / "dataset.csv.tmp").exists()
+
+
+def test_apply_swaps_in_with_one_rename_while_the_dataset_exists(tmp_path, monkeypatch):
+    dataset = tmp_path / "dataset.csv"
+    renames = []
+
+    def recording_replace(src, dst):
+        # The original (and its backup) must still be there when the new file goes in
+        renames.append((Path(src).name, Path(dst).name, dataset.exists(),
+                        len(list(tmp_path.glob("dataset.csv.backup.*")))))
+        return real_replace(src, dst)
+
+    real_replace = normalize_dataset.os.replace
+    monkeypatch.setattr(normalize_dataset.os, "replace", recording_replace)
+    _run(tmp_path, apply_changes=True)
+
+    assert renames == [("dataset.csv.tmp", "dataset.csv", True, 1)]
+    assert dataset.read_bytes() == (FIXTURES / "expected_dataset.csv").read_bytes()
+
+
+def test_failed_write_leaves_dataset_and_no_temp_file(tmp_path, monkeypatch):
+    def failing_to_csv(self, path, **kwargs):
+        Path(path).write_text("partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(pd.DataFrame, "to_csv", failing_to_csv)
+    with pytest.raises(OSError, match="disk full"):
+        _run(tmp_path, apply_changes=True)
+
+    assert (tmp_path / "dataset.csv").read_bytes() == (FIXTURES / "dataset.csv").read_bytes()
+    assert not (tmp_path / "dataset.csv.tmp").exists()
@@ -0,0 +1,93 @@
+import pytest
+
+from phase2_validation import evaluate_rule_based, norm, norm_array, tail_lines
+from rule_based_parser import parse_query, structured_string
+
+BLOCK = 64
+
+
+def _write(path, data: bytes):
+    path.write_bytes(data)
+    return path
+
+
+def _expected(path, n):
+    # What iterating the file in text mode yields
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.readlines()[-n:]
+
+
+def _lines(total_bytes, width=10):
+    """Newline-terminated lines adding up to exactly total_bytes."""
+    out = b""
+    i = 0
+    while len(out) < total_bytes:
+        line = f"line {i:03d}".encode().ljust(width - 1, b".")[: width - 1] + b"\n"
+        out += line[: total_bytes - len(out)]
+        i += 1
+    return out
+
+
+@pytest.mark.parametrize("size", [BLOCK // 2, BLOCK, BLOCK * 5 + 3])
+@pytest.mark.parametrize("trailing_newline", [True, False])
+@pytest.mark.parametrize("n", [1, 3, 50])
+def test_tail_lines_matches_readlines(tmp_path, size, trailing_newline, n):
+    data = _lines(size)
+    if not trailing_newline:
+        data = data[:-1] + b"x"  # same size, but the last line has no line break
+    path = _write(tmp_path / "log.txt", data)
+
+    assert len(data) == size
+    assert tail_lines(path, n, block=BLOCK) == _expected(path, n)
+
+
+def test_tail_lines_default_block(tmp_path):
+    path = _write(tmp_path / "log.txt", _lines(200_000, width=37))
+    assert tail_lines(path, 50) == _expected(path, 50)
+
+
+def test_tail_lines_line_longer_than_block(tmp_path):
+    path = _write(tmp_path / "log.txt", b"short\n" + b"x" * (BLOCK * 3) + b"\nend")
+    assert tail_lines(path, 2, block=BLOCK) == _expected(path, 2)
+
+
+def test_tail_lines_mixed_line_endings(tmp_path):
+    path = _write(tmp_path / "log.txt", b"a\r\nb\rc\nd\r\n" * 20)
+    assert tail_lines(path, 7, block=BLOCK) == _expected(path, 7)
+
+
+def test_tail_lines_empty_file(tmp_path):
+    path = _write(tmp_path / "log.txt", b"")
+    assert tail_lines(path, 5, block=BLOCK) == []
+
+
+FIELDS = ["action", "time", "user", "source", "src_ip", "hostname", "severity", "status_code"]
+
+
+def _gold(query, **labels):
+    return {"nl_query": query, **parse_query(query), **labels}
+
+
+def test_evaluate_rule_based_exact_matches_structured_string_comparison():
+    # Gold labels padded and cased the way hand-edited CSVs come in
+    rows = [
+        _gold("show failed logins from yesterday in auth"),
+        _gold("show failed logins from yesterday in auth", time="Yesterday  "),    # last token: stripped
+        _gold("show failed logins from yesterday in auth", time=" yesterday"),     # leading pad after "="
+        _gold("show failed logins from yesterday in auth", time="*"),
+        _gold("list errors on host web-01 with status 500", status_code="500 "),   # last token: stripped
+        _gold("list errors on host web-01 with status 500", source="web "),        # interior: kept
+        _gold("list errors on host web-01 with status 500", severity="ERROR"),
+        _gold("show sudo activity by user alice today", user="ALICE\t"),          # last token: stripped
+        _gold("show sudo activity by user alice today", time="today "),            # interior: kept
+        _gold("connections from 10.0.0.5 last week", src_ip="10.0.0.5 ", status_code=""),
+    ]
+    y_norm = {f: norm_array([r[f] for r in rows]) for f in FIELDS}
+
+    reference = sum(
+        norm(structured_string(parse_query(r["nl_query"]))) == norm(structured_string({f: r[f] for f in FIELDS}))
+        for r in rows
+    )
+    result = evaluate_rule_based(rows, y_norm)
+    assert result["exact"] == reference == 6
+    assert result["total"] == len(rows)
@@ -0,0 +1,199 @@
+import os
+from multiprocessing import Pool
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import rule_based_parser
+from rule_based_parser import DATASET_FILE, parse_batch, parse_query
+
+FIXTURES = Path(__file__).parent / "fixtures"
+SLOTS = ("action", "time", "user", "source", "src_ip", "hostname", "severity", "status_code")
+
+
+def _slots(**found):
+    """parse_query output: "*" for every slot not listed."""
+    return {slot: found.get(slot, "*") for slot in SLOTS}
+
+
+def _queries():
+    queries = pd.read_csv(DATASET_FILE, dtype=str, keep_default_na=False)["nl_query"].tolist()
+    return queries + ["", "   ", "%%%%%@@@@@", "show me", "SHOW FAILED LOGINS FROM 10.0.0.1 ON web-01"]
+
+
+def test_parse_batch_serial_matches_parse_query():
+    queries = _queries()
+    assert parse_batch(queries) == [parse_query(q) for q in queries]
+
+
+def test_parse_batch_pool_matches_serial(monkeypatch):
+    queries = _queries()
+    serial = parse_batch(queries)
+
+    # Force the worker-pool path regardless of input size and machine
+    monkeypatch.setattr(rule_based_parser, "PARALLEL_MIN_ROWS", 1)
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+    pools = []
+
+    def recording_pool(*args, **kwargs):
+        pools.append(args)
+        return Pool(*args, **kwargs)
+
+    monkeypatch.setattr(rule_based_parser, "Pool", recording_pool)
+    pooled = parse_batch(queries)
+
+    assert pools == [(2,)]
+    assert pooled == serial
+
+
+def test_evaluate_reads_rows_longer_than_the_header(capsys):
+    # Rows 1 and 5 carry extra fields, row 7 stops after status_code
+    rule_based_parser.evaluate(FIXTURES / "ragged_queries.csv", show_fails=1)
+    out = capsys.readouterr().out
+
+    assert out.startswith("Evaluated 8 queries\nExact matches: 0 / 8 = 0.00%\n")
+    assert "  source: 7 / 8 = 87.50%\n" in out
+    assert "  hostname: 7 / 8 = 87.50%\n" in out
+    assert "  status_code: 8 / 8 = 100.00%\n" in out
+    assert (
+        "- NL: find login failure events by user root from ip 10.10.10.5 on db-prod-02 this month in secure shell\n"
+        "  Predicted: action=failure time=last30d user=root source=ssh src_ip=10.10.10.5 hostname=db-prod-02\n"
+        "  Gold:      action=failure user=root source=ssh src_ip=10.10.10.5 hostname=db-prod-02 earliest=-30d@d latest=now\n"
+    ) in out
+
+
+# Keyword phrases: the first value in dict order wins when phrases for several are present
+PHRASE_CASES = [
+    ("show crash reports from the web server today",
+     _slots(action="error", time="today", source="web", hostname="today")),
+    ("file download by bob in the past week", _slots(action="download", time="last7d", user="bob")),
+    ("service restart on db-prod last 30 days",
+     _slots(action="restart", time="last30d", source="database", hostname="db-prod")),
+    ("file deletion events from the file system yesterday",
+     _slots(action="deletion", time="yesterday", source="filesystem", hostname="events")),
+    ("critical alerts in windows event log since midnight",
+     _slots(time="today", source="windows", severity="critical")),
+    ("warn messages from nginx in the past 60 minutes", _slots(time="last1h", source="web", severity="warning")),
+    ("informational notices on the firewall this month",
+     _slots(time="last30d", source="firewall", hostname="the", severity="info")),
+    ("access requests from anonymous through the security log",
+     _slots(action="access", user="anonymous", source="auth")),
+    ("upload failure on app-server", _slots(action="error", source="host", hostname="app-server")),
+    ("problem with ssh connection to the web host", _slots(action="error", source="web", hostname="to")),
+    ("db access from the machine", _slots(action="access", source="database")),
+    ("show errors and warnings", _slots(action="error", severity="error")),
+    ("list notice and err entries", _slots(severity="error")),
+]
+
+
+@pytest.mark.parametrize("query, expected", PHRASE_CASES)
+def test_parse_query_keyword_phrases(query, expected):
+    assert parse_query(query) == expected
+    assert parse_query(query.upper()) == expected
+
+
+# Users (ties go to the earlier entry in `users`, not the earlier position) and hostnames
+USER_HOST_CASES = [
+    ("admin and root sessions this week", _slots(time="last7d", user="root")),
+    ("bob then alice logged in", _slots(user="alice")),
+    ("rooted devices reported by jsmith", _slots(user="jsmith")),
+    ("activity on load-balancer", _slots(hostname="load-balancer")),
+    ("events for server db-prod last hour", _slots(time="last1h", source="database", hostname="db-prod")),
+]
+
+
+@pytest.mark.parametrize("query, expected", USER_HOST_CASES)
+def test_parse_query_users_and_hostnames(query, expected):
+    assert parse_query(query) == expected
+
+
+# An IP or status code after its context word wins over an earlier bare one
+IP_STATUS_CASES = [
+    ("requests from 10.0.0.5 with status 404", _slots(action="access", src_ip="10.0.0.5", status_code="404")),
+    ("address 192.168.1.20 returned 503 after code 200", _slots(src_ip="192.168.1.20", status_code="200")),
+    ("traffic to 172.16.0.9 status 302", _slots(src_ip="172.16.0.9", status_code="302")),
+    ("http 500 errors on web-server",
+     _slots(action="error", source="web", hostname="web-server", severity="error", status_code="500")),
+    ("404 then 500", _slots(status_code="404")),
+]
+
+
+@pytest.mark.parametrize("query, expected", IP_STATUS_CASES)
+def test_parse_query_ips_and_status_codes(query, expected):
+    assert parse_query(query) == expected
+
+
+# Every inflection the trimmed deny/allow regexes still have to catch
+DENY_ALLOW_CASES = [
+    ("denied connections on firewall", _slots(action="deny", source="firewall", hostname="firewall")),
+    ("traffic blocked by fw from 10.1.1.1", _slots(action="deny", source="firewall", src_ip="10.1.1.1")),
+    ("dropped packets yesterday", _slots(action="deny", time="yesterday")),
+    ("requests rejected past week", _slots(action="deny", time="last7d")),
+    ("deny rules in firewall logs", _slots(action="deny", source="firewall")),
+    ("allowed inbound ssh", _slots(action="allow", source="ssh")),
+    ("permitted hosts list", _slots(action="allow", source="host")),
+    ("firewall accepts from 8.8.8.8", _slots(action="allow", source="firewall", src_ip="8.8.8.8")),
+]
+
+
+@pytest.mark.parametrize("query, expected", DENY_ALLOW_CASES)
+def test_parse_query_deny_and_allow(query, expected):
+    assert parse_query(query) == expected
+
+
+# Around the three-dot guard in front of the IP regexes
+DOTTED_CASES = [
+    ("release 1.2.3 notes", _slots()),
+    ("build 1.2.3.4 on server", _slots(source="host", src_ip="1.2.3.4", hostname="server")),
+    ("versions 10.0.0.256 and 1.1.1", _slots(src_ip="10.0.0.256")),
+    ("connection from 010.001.002.003 today",
+     _slots(action="access", time="today", src_ip="010.001.002.003", hostname="from")),
+]
+
+
+@pytest.mark.parametrize("query, expected", DOTTED_CASES)
+def test_parse_query_dotted_quads(query, expected):
+    assert parse_query(query) == expected
+
+
+# The last24h phrases win over "yesterday"; "in the last 24 hours" stays today
+TIME_CASES = [
+    ("since yesterday", _slots(time="last24h")),
+    ("since yesterday's restart", _slots(action="restart", time="last24h")),
+    ("past day errors", _slots(action="error", time="last24h", severity="error")),
+    ("last day", _slots(time="last24h")),
+    ("past 24 hours", _slots(time="last24h")),
+    ("last 24 hours", _slots(time="last24h")),
+    ("in the last 24 hours", _slots(time="today")),
+    ("the previous day", _slots(time="yesterday")),
+]
+
+
+@pytest.mark.parametrize("query, expected", TIME_CASES)
+def test_parse_query_time_overrides(query, expected):
+    assert parse_query(query) == expected
+
+
+# One case per action rule, plus near misses that carry a rule's literal but not its match
+ACTION_CASES = [
+    ("failed login for root", _slots(action="failure", user="root")),
+    ("auth failure on ssh", _slots(action="failure", source="ssh", hostname="ssh")),
+    ("successful login yesterday", _slots(action="success", time="yesterday")),
+    ("event 4624 on windows", _slots(action="success", source="windows", hostname="windows")),
+    ("created user bob", _slots(action="creation", user="bob")),
+    ("event 4720 in event viewer", _slots(action="creation", source="windows")),
+    ("logins from alice", _slots(action="login", user="alice")),
+    ("upload after login", _slots(action="upload")),
+    ("logout events", _slots(action="logout")),
+    ("sign off by admin", _slots(action="logout", user="admin")),
+    ("authenticating against database", _slots(action="login", source="database")),
+    ("auth event log", _slots(action="login", source="windows")),
+    ("author of the upload", _slots(action="upload")),
+    ("sudden spike in traffic", _slots()),
+]
+
+
+@pytest.mark.parametrize("query, expected", ACTION_CASES)
+def test_parse_query_action_rules(query, expected):
+    assert parse_query(query) == expected
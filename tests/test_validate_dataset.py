@@ -0,0 +1,36 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from validate_dataset import build_alias_map, load_schema, validate_csv
+
+FIXTURES = Path(__file__).parent / "fixtures"
+SCRIPT = Path(__file__).parent.parent / "scripts" / "validate_dataset.py"
+SCHEMA = FIXTURES / "normalize" / "schema.yaml"
+
+
+def test_rows_longer_than_the_header_are_validated_on_their_named_fields():
+    # Rows 1 and 5 carry extra fields (row 1 first, where pandas would infer an index column)
+    schema = load_schema(SCHEMA)
+    issues = validate_csv(FIXTURES / "validate_long_rows.csv", schema, build_alias_map(schema))
+
+    assert [(rownum, errs) for rownum, _, errs in issues] == [
+        (2, ["invalid action: 'ERR'", "invalid time: 'bad'", "empty user field",
+             "invalid source: 'weird' (mapped to 'weird')"]),
+        (3, ["empty user field", "invalid source: 'Web Server' (mapped to 'Web Server')"]),
+        (4, ["invalid source: '' (mapped to '')"]),
+        (6, ["invalid action: 'crash'"]),
+    ]
+    assert issues[1][1] == {"nl_query": "multi\nline", "action": "login", "time": "last1h",
+                            "user": "", "source": "Web Server"}
+
+
+def test_cli_reports_instead_of_crashing():
+    result = subprocess.run(
+        [sys.executable, str(SCRIPT), str(FIXTURES / "validate_long_rows.csv"), str(SCHEMA)],
+        capture_output=True, text=True,
+    )
+
+    assert result.returncode == 1
+    assert result.stdout.startswith("Dataset validation: FOUND 4 problematic rows:\n")
+    assert "Row 6: [\"invalid action: 'crash'\"]\n  NL: q6\n" in result.stdout